@@ -1,16 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from ...database import get_db
+from ...database import get_async_db
 from ...models.user import User
 from ...schemas.user import UserCreate, UserLogin, UserResponse, Token
 from ...core.security import (
-    get_password_hash,
-    verify_password,
     create_access_token,
     create_refresh_token
 )
+from ...core.password_hasher import password_hasher
+from ...core.suggest import suggest_index, KIND_USER, user_entry
 from ...config import settings
 from slugify import slugify
 
@@ -18,17 +19,17 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """用户注册"""
     # 检查用户名是否存在
-    if db.query(User).filter(User.username == user_data.username).first():
+    if await db.scalar(select(User.id).where(User.username == user_data.username)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名已存在"
         )
     
     # 检查邮箱是否存在
-    if db.query(User).filter(User.email == user_data.email).first():
+    if await db.scalar(select(User.id).where(User.email == user_data.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="邮箱已被注册"
@@ -41,12 +42,13 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         display_name=user_data.display_name,
         first_name=user_data.first_name,
         last_name=user_data.last_name,
-        password_hash=get_password_hash(user_data.password)
+        password_hash=await password_hasher.hash(user_data.password)
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    suggest_index.upsert(KIND_USER, user_entry(new_user.id, new_user.display_name, new_user.username))
     
     return new_user
 
@@ -54,13 +56,13 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """用户登录"""
     # 查找用户
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await db.scalar(select(User).where(User.username == form_data.username))
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await password_hasher.verify(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
@@ -80,7 +82,7 @@ async def login(
     # 更新最后登录时间
     from datetime import datetime
     user.last_login_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     return {
         "access_token": access_token,
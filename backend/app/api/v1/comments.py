@@ -0,0 +1,161 @@
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...database import get_async_db
+from ...models.comment import Comment, CommentSubmission
+from ...models.content import Content
+from ...schemas.comment import (
+    CommentCreate, CommentStatusUpdate, CommentResponse, CommentThread, CommentSubmissionResponse
+)
+from ...schemas.user import UserPrincipal
+from ...core.security import require_permission
+from ...core.pagination import NEXT_CURSOR_HEADER
+from ...core.comments import APPROVED, load_threads, load_replies, set_comment_status
+from ...core.comment_queue import comment_ingestor
+from ...core.options import options_service
+
+# 评论仍在队列中等待写入
+QUEUED = "queued"
+
+router = APIRouter()
+
+
+def _comment_response(comment: Comment, depth: int = 0) -> CommentResponse:
+    return CommentResponse.model_validate(comment).model_copy(update={"depth": depth})
+
+
+@router.post("", response_model=CommentSubmissionResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_comment(
+    comment_data: CommentCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """提交评论
+    
+    评论先写入队列并立即返回待处理的id,由后台任务批量评分和写入;
+    可通过 /submissions/{id} 查询处理结果。
+    """
+    # 维护模式下暂停接收评论(选项读取通常命中进程内缓存)
+    if await options_service.get("site_maintenance", False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="网站维护中,暂时无法提交评论"
+        )
+    
+    if not await db.scalar(select(Content.id).where(
+        Content.id == comment_data.content_id,
+        Content.status == 'published'
+    )):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="内容不存在"
+        )
+    
+    submission = CommentSubmission(
+        id=uuid.uuid4(),
+        content_id=comment_data.content_id,
+        payload={
+            **comment_data.model_dump(mode="json", exclude={'content_id'}),
+            "author_ip": request.client.host if request.client else "0.0.0.0",
+            "user_agent": request.headers.get("user-agent")
+        }
+    )
+    db.add(submission)
+    await db.commit()
+    comment_ingestor.wake()
+    
+    return CommentSubmissionResponse(id=submission.id, status=QUEUED)
+
+
+@router.get("/submissions/{submission_id}", response_model=CommentSubmissionResponse)
+async def get_comment_submission(
+    submission_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """查询评论提交的处理结果(queued或写入后的评论状态)"""
+    comment_status = await db.scalar(select(Comment.status).where(Comment.id == submission_id))
+    if comment_status:
+        return CommentSubmissionResponse(id=submission_id, status=comment_status)
+    if await db.scalar(select(CommentSubmission.id).where(CommentSubmission.id == submission_id)):
+        return CommentSubmissionResponse(id=submission_id, status=QUEUED)
+    
+    # 队列中和评论表中都没有: 已被丢弃(内容已下线或回复的评论不存在)
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="评论提交不存在"
+    )
+
+
+@router.get("", response_model=List[CommentThread])
+async def list_comment_threads(
+    response: Response,
+    content_id: uuid.UUID,
+    limit: int = Query(20, ge=1, le=100),
+    replies: int = Query(10, ge=0, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取内容的评论线程(一条查询加载整页线程及每个线程的前几条回复)
+    
+    下一页线程的游标通过响应头返回;线程中未加载完的回复使用replies_cursor
+    调用 /{comment_id}/replies 继续加载。
+    """
+    threads, next_cursor = await load_threads(db, content_id, limit, replies, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    return [
+        CommentThread(
+            **_comment_response(thread["comment"]).model_dump(),
+            replies=[_comment_response(comment, depth) for comment, depth in thread["replies"]],
+            reply_total=thread["reply_total"],
+            replies_cursor=thread["replies_cursor"]
+        )
+        for thread in threads
+    ]
+
+
+@router.get("/{comment_id}/replies", response_model=List[CommentResponse])
+async def list_comment_replies(
+    comment_id: uuid.UUID,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """按树的先序分页获取评论下的全部回复(depth为相对该评论的层级)"""
+    if not await db.scalar(select(Comment.id).where(Comment.id == comment_id, Comment.status == APPROVED)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="评论不存在"
+        )
+    
+    rows, next_cursor = await load_replies(db, comment_id, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    return [_comment_response(comment, depth) for comment, depth in rows]
+
+
+@router.put("/{comment_id}/status", response_model=CommentResponse)
+async def update_comment_status(
+    comment_id: uuid.UUID,
+    status_update: CommentStatusUpdate,
+    current_user: UserPrincipal = Depends(require_permission("comments.moderate")),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """审核评论(修改状态并同步父评论的回复数)"""
+    comment = await db.scalar(select(Comment).where(Comment.id == comment_id).with_for_update())
+    if not comment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="评论不存在"
+        )
+    
+    await set_comment_status(db, comment, status_update.status, current_user.id)
+    await db.commit()
+    await db.refresh(comment)
+    
+    return _comment_response(comment)
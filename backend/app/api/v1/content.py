@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ...database import get_db
+from ...database import get_async_db, AsyncSessionLocal
 from ...models.content import Content
-from ...models.user import User
-from ...schemas.content import ContentCreate, ContentUpdate, ContentResponse
-from ...core.security import get_current_active_user
-from slugify import slugify
+from ...schemas.content import ContentCreate, ContentUpdate, ContentResponse, ContentSearchResult
+from ...schemas.user import UserPrincipal
+from ...core.security import get_current_active_user, has_permission
+from ...core.view_counter import view_counter
+from ...core.pagination import paginate, NEXT_CURSOR_HEADER
+from ...core.search import search_content, ensure_search_config
+from ...core.suggest import suggest_index, KIND_CONTENT, content_entry
+from ...core.content_transfer import ContentImporter, export_ndjson
+from ...core.slugs import flush_with_slug
+from ...core.scheduled_publisher import scheduled_publisher
+from ...config import settings
+from ...core.http_cache import conditional_response, json_response
+from ...core.response_cache import response_cache, make_entry, entry_last_modified, content_tag, content_modules_tag, media_tag
 import uuid
 from datetime import datetime
 
@@ -16,30 +27,17 @@ router = APIRouter()
 @router.post("", response_model=ContentResponse, status_code=status.HTTP_201_CREATED)
 async def create_content(
     content_data: ContentCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建内容"""
-    # 生成slug
-    if not content_data.slug:
-        base_slug = slugify(content_data.title)
-        slug = base_slug
-        counter = 1
-        while db.query(Content).filter(Content.slug == slug).first():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-    else:
-        slug = content_data.slug
-        if db.query(Content).filter(Content.slug == slug).first():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="该slug已存在"
-            )
+    search_config = content_data.search_config or settings.SEARCH_DEFAULT_CONFIG
+    await ensure_search_config(db, search_config)
     
     # 创建内容
     new_content = Content(
-        **content_data.dict(exclude={'slug'}),
-        slug=slug,
+        **content_data.dict(exclude={'slug', 'search_config'}),
+        search_config=search_config,
         author_id=current_user.id
     )
     
@@ -47,54 +45,123 @@ async def create_content(
     if new_content.status == 'published' and not new_content.published_at:
         new_content.published_at = datetime.utcnow()
     
-    db.add(new_content)
-    db.commit()
-    db.refresh(new_content)
+    # 写入时分配slug(未指定时根据标题生成,冲突则加数字后缀)
+    await flush_with_slug(
+        db, new_content, content_data.slug or content_data.title, exact=bool(content_data.slug)
+    )
+    await db.commit()
+    await db.refresh(new_content)
+    suggest_index.upsert(KIND_CONTENT, content_entry(
+        new_content.id, new_content.title, new_content.slug, new_content.content_type, new_content.status
+    ))
+    if new_content.status == 'scheduled':
+        scheduled_publisher.wake(new_content.scheduled_for)
     
     return new_content
 
 
 @router.get("", response_model=List[ContentResponse])
 async def list_content(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
     content_type: Optional[str] = None,
     status: Optional[str] = None,
     author_id: Optional[uuid.UUID] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取内容列表"""
-    query = db.query(Content)
+    query = select(Content)
     
     if content_type:
-        query = query.filter(Content.content_type == content_type)
+        query = query.where(Content.content_type == content_type)
     if status:
-        query = query.filter(Content.status == status)
+        query = query.where(Content.status == status)
     if author_id:
-        query = query.filter(Content.author_id == author_id)
+        query = query.where(Content.author_id == author_id)
+    
+    contents = await paginate(db, query, Content, response, limit, skip, cursor)
     
-    query = query.order_by(Content.created_at.desc())
-    content_list = query.offset(skip).limit(limit).all()
+    not_modified = conditional_response(request, response, [(c.id, c.updated_at) for c in contents])
+    if not_modified:
+        return not_modified
+    return contents
+
+
+@router.post("/import")
+async def import_content(
+    request: Request,
+    batch_size: int = Query(settings.CONTENT_IMPORT_BATCH_SIZE, ge=1, le=5000),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """批量导入内容(请求体为NDJSON,每行一个ContentCreate)
     
-    return content_list
+    请求体边接收边按批写入,每批独立提交;返回导入、失败和slug被改名的数量。
+    """
+    importer = ContentImporter(author_id=current_user.id, batch_size=batch_size)
+    try:
+        return await importer.run(request.stream())
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": str(e), **importer.summary()}
+        )
+
+
+@router.get("/export")
+async def export_content(
+    content_type: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """以NDJSON流式导出内容"""
+    return StreamingResponse(
+        export_ndjson(content_type=content_type, status=status),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="content.ndjson"'}
+    )
+
+
+@router.get("/search", response_model=List[ContentSearchResult])
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    content_type: Optional[str] = None,
+    status: Optional[str] = "published",
+    term_id: Optional[uuid.UUID] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """搜索内容(按相关度排序,带高亮片段)"""
+    results, next_cursor = await search_content(
+        db, q, limit, cursor,
+        content_type=content_type,
+        status=status,
+        term_id=term_id
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return results
 
 
 @router.get("/{content_id}", response_model=ContentResponse)
 async def get_content(
     content_id: uuid.UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取指定内容"""
-    content = db.query(Content).filter(Content.id == content_id).first()
+    content = await db.scalar(select(Content).where(Content.id == content_id))
     if not content:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="内容不存在"
         )
     
-    # 增加浏览次数
-    content.view_count += 1
-    db.commit()
+    # 增加浏览次数(缓冲后批量写入)
+    await view_counter.incr(content.id)
     
     return content
 
@@ -102,41 +169,55 @@ async def get_content(
 @router.get("/slug/{slug}", response_model=ContentResponse)
 async def get_content_by_slug(
     slug: str,
-    db: Session = Depends(get_db)
+    request: Request
 ):
     """通过slug获取内容"""
-    content = db.query(Content).filter(Content.slug == slug).first()
-    if not content:
+    async def build():
+        # 构建任务可能被多个请求共享,使用独立的会话
+        async with AsyncSessionLocal() as db:
+            content = await db.scalar(select(Content).where(Content.slug == slug))
+            if not content:
+                return None
+            tags = [content_tag(content.id)]
+            if content.featured_image_id:
+                tags.append(media_tag(content.featured_image_id))
+            return make_entry(
+                ContentResponse.model_validate(content).model_dump_json(by_alias=True).encode(),
+                [(content.id, content.updated_at)],
+                tags,
+                {"id": str(content.id)}
+            )
+    
+    entry = await response_cache.get_or_build(f"content:slug:{slug}", build)
+    if entry is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="内容不存在"
         )
     
-    # 增加浏览次数
-    content.view_count += 1
-    db.commit()
+    # 增加浏览次数(缓冲后批量写入),缓存命中和304同样计为一次浏览
+    await view_counter.incr(uuid.UUID(entry["meta"]["id"]))
     
-    return content
+    return json_response(request, entry["body"].encode(), entry["etag"], entry_last_modified(entry))
 
 
 @router.put("/{content_id}", response_model=ContentResponse)
 async def update_content(
     content_id: uuid.UUID,
     content_update: ContentUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新内容"""
-    content = db.query(Content).filter(Content.id == content_id).first()
+    content = await db.scalar(select(Content).where(Content.id == content_id))
     if not content:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="内容不存在"
         )
     
-    # 检查权限(只有作者或管理员可以编辑)
-    if content.author_id != current_user.id:
-        # 这里应该检查是否为管理员,暂时简化处理
+    # 检查权限(作者本人,或拥有content.update权限的用户)
+    if content.author_id != current_user.id and not has_permission(current_user, "content.update"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="无权编辑此内容"
@@ -146,17 +227,16 @@ async def update_content(
     update_data = content_update.dict(exclude_unset=True)
     
     # 如果更新了标题但没有更新slug,自动生成新slug
-    if 'title' in update_data and 'slug' not in update_data:
-        base_slug = slugify(update_data['title'])
-        slug = base_slug
-        counter = 1
-        while db.query(Content).filter(
-            Content.slug == slug,
-            Content.id != content_id
-        ).first():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        update_data['slug'] = slug
+    slug = update_data.pop('slug', None)
+    if slug is None and 'title' in update_data:
+        slug_source, exact = update_data['title'], False
+    else:
+        slug_source, exact = slug, True
+    
+    if update_data.get('search_config'):
+        await ensure_search_config(db, update_data['search_config'])
+    elif 'search_config' in update_data:
+        del update_data['search_config']
     
     # 如果状态改为published,设置发布时间
     if update_data.get('status') == 'published' and not content.published_at:
@@ -165,8 +245,17 @@ async def update_content(
     for field, value in update_data.items():
         setattr(content, field, value)
     
-    db.commit()
-    db.refresh(content)
+    if slug_source and slug_source != content.slug:
+        await flush_with_slug(db, content, slug_source, Content.id != content_id, exact=exact)
+    
+    await db.commit()
+    await db.refresh(content)
+    await response_cache.invalidate_tags([content_tag(content_id)])
+    suggest_index.upsert(KIND_CONTENT, content_entry(
+        content.id, content.title, content.slug, content.content_type, content.status
+    ))
+    if content.status == 'scheduled':
+        scheduled_publisher.wake(content.scheduled_for)
     
     return content
 
@@ -174,25 +263,27 @@ async def update_content(
 @router.delete("/{content_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_content(
     content_id: uuid.UUID,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除内容"""
-    content = db.query(Content).filter(Content.id == content_id).first()
+    content = await db.scalar(select(Content).where(Content.id == content_id))
     if not content:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="内容不存在"
         )
     
-    # 检查权限
-    if content.author_id != current_user.id:
+    # 检查权限(作者本人,或拥有content.delete权限的用户)
+    if content.author_id != current_user.id and not has_permission(current_user, "content.delete"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="无权删除此内容"
         )
     
-    db.delete(content)
-    db.commit()
+    await db.delete(content)
+    await db.commit()
+    await response_cache.invalidate_tags([content_tag(content_id), content_modules_tag(content_id)])
+    suggest_index.remove(KIND_CONTENT, content_id)
     
     return None
@@ -1,48 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Response, BackgroundTasks
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ...database import get_db
+from ...database import get_async_db
 from ...models.media import Media
-from ...models.user import User
 from ...schemas.media import MediaCreate, MediaUpdate, MediaResponse
+from ...schemas.user import UserPrincipal
 from ...core.security import get_current_active_user
+from ...core.pagination import paginate
+from ...core.storage import save_upload, save_content_addressed, release_file, upload_url
+from ...core.images import process_image, ensure_variant, release_variants
+from ...core.response_cache import response_cache, media_tag
 from ...config import settings
 import uuid
 import os
 from datetime import datetime
-import shutil
 
 router = APIRouter()
 
 
 @router.post("/upload", response_model=MediaResponse, status_code=status.HTTP_201_CREATED)
 async def upload_media(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """上传媒体文件"""
-    # 检查文件大小
-    if file.size > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"文件大小超过限制({settings.MAX_UPLOAD_SIZE} bytes)"
-        )
-    
-    # 创建上传目录
-    upload_dir = os.path.join(settings.UPLOAD_DIR, datetime.now().strftime("%Y/%m"))
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # 生成文件名
     file_ext = os.path.splitext(file.filename)[1]
-    filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(upload_dir, filename)
     
-    # 保存文件
+    # 分块保存文件(边写边检查大小并计算哈希)
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
+        if settings.MEDIA_STORAGE_MODE == "content":
+            # 内容寻址存储:相同内容的文件只保存一份
+            file_path, file_size, sha256, _ = await save_content_addressed(db, file, file_ext)
+        else:
+            # 只取一次当前时间,保证文件路径和URL落在同一个月份目录
+            date_dir = datetime.now().strftime("%Y/%m")
+            file_path = os.path.join(settings.UPLOAD_DIR, date_dir, f"{uuid.uuid4()}{file_ext}")
+            file_size, sha256 = await save_upload(file, file_path)
+    except OSError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"文件保存失败: {str(e)}"
@@ -50,50 +48,54 @@ async def upload_media(
     
     # 创建媒体记录
     media = Media(
-        filename=filename,
+        filename=os.path.basename(file_path),
         original_filename=file.filename,
         file_path=file_path,
-        file_url=f"/uploads/{datetime.now().strftime('%Y/%m')}/{filename}",
+        file_url=upload_url(file_path),
         mime_type=file.content_type,
-        file_size=file.size
+        file_size=file_size,
+        content_hash=sha256
     )
     
     db.add(media)
-    db.commit()
-    db.refresh(media)
+    await db.commit()
+    await db.refresh(media)
+    
+    # 图片在响应返回后进入进程池处理(尺寸、EXIF和衍生图片)
+    if media.mime_type and media.mime_type.startswith("image/"):
+        background_tasks.add_task(process_image, media.id)
     
     return media
 
 
 @router.get("", response_model=List[MediaResponse])
 async def list_media(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
     mime_type: Optional[str] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取媒体列表"""
-    query = db.query(Media)
+    query = select(Media)
     
     if mime_type:
-        query = query.filter(Media.mime_type.like(f"{mime_type}%"))
+        query = query.where(Media.mime_type.like(f"{mime_type}%"))
     if status:
-        query = query.filter(Media.status == status)
-    
-    query = query.order_by(Media.created_at.desc())
-    media_list = query.offset(skip).limit(limit).all()
+        query = query.where(Media.status == status)
     
-    return media_list
+    return await paginate(db, query, Media, response, limit, skip, cursor)
 
 
 @router.get("/{media_id}", response_model=MediaResponse)
 async def get_media(
     media_id: uuid.UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取指定媒体"""
-    media = db.query(Media).filter(Media.id == media_id).first()
+    media = await db.scalar(select(Media).where(Media.id == media_id))
     if not media:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -102,15 +104,50 @@ async def get_media(
     return media
 
 
+@router.get("/{media_id}/variants/{width}/{fmt}")
+async def get_media_variant(
+    media_id: uuid.UUID,
+    width: int,
+    fmt: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取衍生图片,尚未生成的尺寸在首次请求时生成"""
+    if width not in settings.IMAGE_VARIANT_WIDTHS or fmt not in settings.IMAGE_VARIANT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="不支持的图片尺寸或格式"
+        )
+    
+    media = await db.scalar(select(Media).where(Media.id == media_id))
+    if not media or not media.mime_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="媒体不存在"
+        )
+    
+    try:
+        path = await ensure_variant(db, media, width, fmt)
+    except (OSError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"图片处理失败: {str(e)}"
+        )
+    if path is None:
+        # 请求的宽度不小于原图,直接返回原图
+        return FileResponse(media.file_path, media_type=media.mime_type)
+    
+    return FileResponse(path, media_type=f"image/{fmt}")
+
+
 @router.put("/{media_id}", response_model=MediaResponse)
 async def update_media(
     media_id: uuid.UUID,
     media_update: MediaUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新媒体信息"""
-    media = db.query(Media).filter(Media.id == media_id).first()
+    media = await db.scalar(select(Media).where(Media.id == media_id))
     if not media:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -121,8 +158,9 @@ async def update_media(
     for field, value in update_data.items():
         setattr(media, field, value)
     
-    db.commit()
-    db.refresh(media)
+    await db.commit()
+    await db.refresh(media)
+    await response_cache.invalidate_tags([media_tag(media_id)])
     
     return media
 
@@ -130,25 +168,23 @@ async def update_media(
 @router.delete("/{media_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_media(
     media_id: uuid.UUID,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除媒体"""
-    media = db.query(Media).filter(Media.id == media_id).first()
+    media = await db.scalar(select(Media).where(Media.id == media_id))
     if not media:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="媒体不存在"
         )
     
-    # 删除文件
-    try:
-        if os.path.exists(media.file_path):
-            os.remove(media.file_path)
-    except Exception as e:
-        print(f"删除文件失败: {e}")
+    # 没有其他媒体记录引用同一文件时才删除文件和衍生图片
+    await release_file(db, media)
+    await release_variants(db, media)
     
-    db.delete(media)
-    db.commit()
+    await db.delete(media)
+    await db.commit()
+    await response_cache.invalidate_tags([media_tag(media_id)])
     
     return None
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException, status, Request, Path
+from ...database import AsyncSessionLocal
+from ...schemas.module import MenuTree
+from ...core.menus import build_menu_tree
+from ...core.http_cache import json_response
+from ...core.response_cache import response_cache, entry_last_modified
+
+router = APIRouter()
+
+
+@router.get("/{location}", response_model=MenuTree)
+async def get_menu(
+    request: Request,
+    location: str = Path(..., max_length=50)
+):
+    """获取指定位置的菜单及完整的嵌套菜单项
+    
+    菜单树按位置缓存为序列化好的响应体,菜单或菜单项的任何写入都会使其失效;支持条件请求。
+    """
+    async def build():
+        # 构建任务可能被多个请求共享,使用独立的会话
+        async with AsyncSessionLocal() as db:
+            return await build_menu_tree(db, location)
+    
+    entry = await response_cache.get_or_build(f"menus:{location}", build)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="该位置没有菜单"
+        )
+    
+    return json_response(request, entry["body"].encode(), entry["etag"], entry_last_modified(entry))
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ...database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Any
+from collections import defaultdict
+from pydantic import TypeAdapter
+from ...database import get_async_db, AsyncSessionLocal
 from ...models.module import ModuleType, PageModule, ModuleData
-from ...models.user import User
 from ...schemas.module import (
     ModuleTypeCreate,
     ModuleTypeResponse,
@@ -14,22 +16,70 @@ from ...schemas.module import (
     ModuleDataResponse,
     PageModuleFull
 )
+from ...schemas.user import UserPrincipal
 from ...core.security import get_current_active_user
+from ...core.module_type_cache import module_type_cache
+from ...core.http_cache import conditional_response, json_response
+from ...core.response_cache import (
+    response_cache,
+    make_entry,
+    entry_last_modified,
+    media_refs,
+    content_modules_tag,
+    module_tag,
+    module_type_tag,
+    media_tag
+)
+from ...config import settings
 import uuid
 
 router = APIRouter()
 
+page_module_list_adapter = TypeAdapter(List[PageModuleFull])
+
+
+async def load_module_tree(db: AsyncSession, modules: List[PageModule]) -> List[Dict[str, Any]]:
+    """批量加载页面模块的数据和类型
+    
+    模块数据用一条IN查询取回后在内存中分组,模块类型来自进程级缓存,
+    查询次数与模块数量无关。
+    """
+    if not modules:
+        return []
+    
+    module_ids = [module.id for module in modules]
+    data_rows = (await db.scalars(
+        select(ModuleData).where(ModuleData.page_module_id.in_(module_ids))
+    )).all()
+    
+    data_by_module = defaultdict(list)
+    for row in data_rows:
+        data_by_module[row.page_module_id].append(row)
+    
+    module_types = await module_type_cache.get_many(
+        db, {module.module_type_id for module in modules}
+    )
+    
+    return [
+        {
+            **module.__dict__,
+            "module_data": data_by_module[module.id],
+            "module_type": module_types.get(module.module_type_id)
+        }
+        for module in modules
+    ]
+
 
 # 模块类型相关API
 @router.post("/types", response_model=ModuleTypeResponse, status_code=status.HTTP_201_CREATED)
 async def create_module_type(
     module_type_data: ModuleTypeCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建模块类型(需要管理员权限)"""
     # 检查名称是否已存在
-    if db.query(ModuleType).filter(ModuleType.name == module_type_data.name).first():
+    if await db.scalar(select(ModuleType.id).where(ModuleType.name == module_type_data.name)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="模块类型名称已存在"
@@ -37,38 +87,48 @@ async def create_module_type(
     
     module_type = ModuleType(**module_type_data.dict())
     db.add(module_type)
-    db.commit()
-    db.refresh(module_type)
+    await db.commit()
+    await db.refresh(module_type)
+    module_type_cache.invalidate()
     
     return module_type
 
 
 @router.get("/types", response_model=List[ModuleTypeResponse])
 async def list_module_types(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     is_active: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取模块类型列表"""
-    query = db.query(ModuleType)
+    query = select(ModuleType)
     
     if is_active is not None:
-        query = query.filter(ModuleType.is_active == is_active)
+        query = query.where(ModuleType.is_active == is_active)
     
     query = query.order_by(ModuleType.sort_order, ModuleType.name)
-    module_types = query.offset(skip).limit(limit).all()
+    module_types = (await db.scalars(query.offset(skip).limit(limit))).all()
     
+    not_modified = conditional_response(
+        request, response,
+        [(t.id, t.updated_at) for t in module_types],
+        max_age=settings.HTTP_CACHE_MODULE_TYPES_MAX_AGE
+    )
+    if not_modified:
+        return not_modified
     return module_types
 
 
 @router.get("/types/{type_id}", response_model=ModuleTypeResponse)
 async def get_module_type(
     type_id: uuid.UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取指定模块类型"""
-    module_type = db.query(ModuleType).filter(ModuleType.id == type_id).first()
+    module_type = await db.scalar(select(ModuleType).where(ModuleType.id == type_id))
     if not module_type:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -81,14 +141,15 @@ async def get_module_type(
 @router.post("", response_model=PageModuleResponse, status_code=status.HTTP_201_CREATED)
 async def create_page_module(
     module_data: PageModuleCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建页面模块"""
     page_module = PageModule(**module_data.dict())
     db.add(page_module)
-    db.commit()
-    db.refresh(page_module)
+    await db.commit()
+    await db.refresh(page_module)
+    await response_cache.invalidate_tags([content_modules_tag(page_module.content_id)])
     
     return page_module
 
@@ -96,41 +157,52 @@ async def create_page_module(
 @router.get("/content/{content_id}", response_model=List[PageModuleFull])
 async def list_page_modules_by_content(
     content_id: uuid.UUID,
-    db: Session = Depends(get_db)
+    request: Request
 ):
     """获取指定内容的所有页面模块"""
-    modules = db.query(PageModule).filter(
-        PageModule.content_id == content_id,
-        PageModule.is_active == True
-    ).order_by(PageModule.module_order).all()
-    
-    # 加载模块数据
-    result = []
-    for module in modules:
-        module_data = db.query(ModuleData).filter(
-            ModuleData.page_module_id == module.id
-        ).all()
+    async def build():
+        # 构建任务可能被多个请求共享,使用独立的会话
+        async with AsyncSessionLocal() as db:
+            modules = (await db.scalars(
+                select(PageModule).where(
+                    PageModule.content_id == content_id,
+                    PageModule.is_active == True
+                ).order_by(PageModule.module_order)
+            )).all()
+            
+            # 批量加载模块数据和类型
+            tree = await load_module_tree(db, modules)
         
-        module_type = db.query(ModuleType).filter(
-            ModuleType.id == module.module_type_id
-        ).first()
+        # 模块、模块数据和模块类型任一变化都会改变ETag
+        versions = []
+        tags = {content_modules_tag(content_id)}
+        for module in tree:
+            versions.append((module["id"], module["updated_at"]))
+            tags.add(module_tag(module["id"]))
+            for data in module["module_data"]:
+                versions.append((data.id, data.updated_at))
+                tags.update(media_tag(ref) for ref in media_refs(data.data_value))
+            if module["module_type"]:
+                versions.append((module["module_type"].id, module["module_type"].updated_at))
+                tags.add(module_type_tag(module["module_type"].id))
         
-        result.append({
-            **module.__dict__,
-            "module_data": module_data,
-            "module_type": module_type
-        })
+        body = page_module_list_adapter.dump_json(
+            page_module_list_adapter.validate_python(tree, from_attributes=True),
+            by_alias=True
+        )
+        return make_entry(body, versions, tags)
     
-    return result
+    entry = await response_cache.get_or_build(f"modules:content:{content_id}", build)
+    return json_response(request, entry["body"].encode(), entry["etag"], entry_last_modified(entry))
 
 
 @router.get("/{module_id}", response_model=PageModuleFull)
 async def get_page_module(
     module_id: uuid.UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取指定页面模块"""
-    module = db.query(PageModule).filter(PageModule.id == module_id).first()
+    module = await db.scalar(select(PageModule).where(PageModule.id == module_id))
     if not module:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -138,30 +210,18 @@ async def get_page_module(
         )
     
     # 加载模块数据
-    module_data = db.query(ModuleData).filter(
-        ModuleData.page_module_id == module.id
-    ).all()
-    
-    module_type = db.query(ModuleType).filter(
-        ModuleType.id == module.module_type_id
-    ).first()
-    
-    return {
-        **module.__dict__,
-        "module_data": module_data,
-        "module_type": module_type
-    }
+    return (await load_module_tree(db, [module]))[0]
 
 
 @router.put("/{module_id}", response_model=PageModuleResponse)
 async def update_page_module(
     module_id: uuid.UUID,
     module_update: PageModuleUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新页面模块"""
-    module = db.query(PageModule).filter(PageModule.id == module_id).first()
+    module = await db.scalar(select(PageModule).where(PageModule.id == module_id))
     if not module:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -172,8 +232,10 @@ async def update_page_module(
     for field, value in update_data.items():
         setattr(module, field, value)
     
-    db.commit()
-    db.refresh(module)
+    await db.commit()
+    await db.refresh(module)
+    # 启用或停用模块会改变所属内容的模块列表
+    await response_cache.invalidate_tags([module_tag(module_id), content_modules_tag(module.content_id)])
     
     return module
 
@@ -181,19 +243,20 @@ async def update_page_module(
 @router.delete("/{module_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_page_module(
     module_id: uuid.UUID,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除页面模块"""
-    module = db.query(PageModule).filter(PageModule.id == module_id).first()
+    module = await db.scalar(select(PageModule).where(PageModule.id == module_id))
     if not module:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="页面模块不存在"
         )
     
-    db.delete(module)
-    db.commit()
+    await db.delete(module)
+    await db.commit()
+    await response_cache.invalidate_tags([module_tag(module_id)])
     
     return None
 
@@ -203,12 +266,12 @@ async def delete_page_module(
 async def upsert_module_data(
     module_id: uuid.UUID,
     data: ModuleDataUpsert,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建或更新模块数据"""
     # 检查模块是否存在
-    module = db.query(PageModule).filter(PageModule.id == module_id).first()
+    module = await db.scalar(select(PageModule).where(PageModule.id == module_id))
     if not module:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -216,16 +279,19 @@ async def upsert_module_data(
         )
     
     # 查找已存在的数据
-    existing_data = db.query(ModuleData).filter(
-        ModuleData.page_module_id == module_id,
-        ModuleData.data_key == data.data_key
-    ).first()
+    existing_data = await db.scalar(
+        select(ModuleData).where(
+            ModuleData.page_module_id == module_id,
+            ModuleData.data_key == data.data_key
+        )
+    )
     
     if existing_data:
         # 更新现有数据
         existing_data.data_value = data.data_value
-        db.commit()
-        db.refresh(existing_data)
+        await db.commit()
+        await db.refresh(existing_data)
+        await response_cache.invalidate_tags([module_tag(module_id)])
         return existing_data
     else:
         # 创建新数据
@@ -235,6 +301,7 @@ async def upsert_module_data(
             data_value=data.data_value
         )
         db.add(new_data)
-        db.commit()
-        db.refresh(new_data)
+        await db.commit()
+        await db.refresh(new_data)
+        await response_cache.invalidate_tags([module_tag(module_id)])
         return new_data
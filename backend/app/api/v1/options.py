@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Path
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...database import get_async_db
+from ...models.module import Option
+from ...schemas.option import OptionUpdate, OptionResponse
+from ...schemas.user import UserPrincipal
+from ...core.security import require_permission
+from ...core.http_cache import json_response
+from ...core.options import options_service
+from ...config import settings
+
+router = APIRouter()
+
+
+@router.get("/public")
+async def get_public_options(request: Request):
+    """获取所有公开选项(直接返回快照中预先序列化的响应体,支持条件请求)"""
+    body, etag, last_modified = options_service.public_response()
+    return json_response(
+        request, body, etag, last_modified,
+        max_age=settings.OPTIONS_PUBLIC_MAX_AGE
+    )
+
+
+@router.get("/{option_name}", response_model=OptionResponse)
+async def get_option(
+    option_name: str = Path(..., max_length=100),
+    current_user: UserPrincipal = Depends(require_permission("settings.manage")),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取选项详情"""
+    option = await db.scalar(select(Option).where(Option.option_name == option_name))
+    if not option:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="选项不存在"
+        )
+    return option
+
+
+@router.put("/{option_name}", response_model=OptionResponse)
+async def put_option(
+    option_update: OptionUpdate,
+    option_name: str = Path(..., max_length=100),
+    current_user: UserPrincipal = Depends(require_permission("settings.manage")),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """创建或更新选项(各worker通过变更通知重新加载)"""
+    values = option_update.dict(exclude_unset=True)
+    stmt = insert(Option).values(option_name=option_name, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Option.option_name],
+        set_={key: stmt.excluded[key] for key in values}
+    ).returning(Option)
+    option = (await db.scalars(stmt, execution_options={"populate_existing": True})).one()
+    await db.commit()
+    
+    # 本进程立即生效,不等待通知
+    await options_service.reload()
+    return option
+
+
+@router.delete("/{option_name}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_option(
+    option_name: str = Path(..., max_length=100),
+    current_user: UserPrincipal = Depends(require_permission("settings.manage")),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """删除选项"""
+    deleted = await db.scalar(
+        delete(Option).where(Option.option_name == option_name).returning(Option.id)
+    )
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="选项不存在"
+        )
+    await db.commit()
+    await options_service.reload()
@@ -1,77 +1,96 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select, literal_column, cast, Date, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, List
-from ...database import get_db
+from ...database import get_async_db
 from ...models.content import Content
 from ...models.user import User
 from ...models.comment import Comment
 from ...models.media import Media
-from datetime import datetime, timedelta
+from ...models.stats import DailySiteStats
+from ...core.cache import TTLCache
+from ...config import settings
 
 router = APIRouter()
 
+# 统计结果短期缓存,避免轮询仪表盘时反复扫描大表
+stats_cache = TTLCache(ttl=settings.STATS_CACHE_TTL)
+
+# 趋势统计的天数
+TREND_DAYS = 7
+
+
+async def get_daily_trend(db: AsyncSession, days: int = TREND_DAYS) -> List[Dict[str, Any]]:
+    """按天分组统计最近几天的文章发布数和浏览量
+    
+    用generate_series生成UTC日期序列,左连接按天聚合的发布数和全站每日统计中的浏览量,
+    一条语句返回所有天的数据。
+    """
+    # 日期一律按UTC计算,与每日统计表的分桶一致,不受会话时区影响
+    today = cast(func.timezone(literal_column("'UTC'"), func.now()), Date)
+    start = today - literal_column(str(days - 1))
+    
+    series = select(
+        (today - func.generate_series(literal_column("0"), literal_column(str(days - 1)))).label("day")
+    ).subquery()
+    
+    created_day = cast(func.timezone(literal_column("'UTC'"), Content.created_at), Date)
+    daily = select(
+        created_day.label("day"),
+        func.count().label("posts")
+    ).where(
+        Content.content_type == 'post',
+        Content.created_at >= func.timezone(literal_column("'UTC'"), cast(start, DateTime))
+    ).group_by(created_day).subquery()
+    
+    # 浏览量来自全站每日统计,只读取O(天数)行
+    rows = (await db.execute(
+        select(
+            series.c.day,
+            func.coalesce(daily.c.posts, 0),
+            func.coalesce(DailySiteStats.views, 0)
+        ).outerjoin(
+            daily, daily.c.day == series.c.day
+        ).outerjoin(
+            DailySiteStats, DailySiteStats.day == series.c.day
+        ).order_by(series.c.day)
+    )).all()
+    
+    return [
+        {"date": day.strftime("%Y-%m-%d"), "posts": int(posts), "views": int(views)}
+        for day, posts, views in rows
+    ]
+
 
 @router.get("/dashboard")
-async def get_dashboard_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def get_dashboard_stats(db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
     """获取仪表盘统计数据"""
-    
-    # 用户总数
-    total_users = db.query(func.count(User.id)).scalar() or 0
-    
-    # 文章总数（只统计文章类型）
-    total_posts = db.query(func.count(Content.id)).filter(
-        Content.content_type == 'post'
-    ).scalar() or 0
-    
-    # 评论总数
-    total_comments = db.query(func.count(Comment.id)).scalar() or 0
-    
-    # 总浏览量
-    total_views = db.query(func.sum(Content.view_count)).scalar() or 0
-    
-    # 最近7天的浏览量趋势
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    view_trend = []
-    for i in range(7):
-        day = seven_days_ago + timedelta(days=i)
-        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-        
-        # 这里简化处理，使用created_at作为代理（实际应该有专门的浏览记录表）
-        # 由于没有浏览记录表，使用当天创建的内容的总浏览量作为估算
-        daily_views = db.query(func.sum(Content.view_count)).filter(
-            Content.created_at >= day_start,
-            Content.created_at < day_end
-        ).scalar() or 0
-        
-        view_trend.append({
-            "date": day_start.strftime("%Y-%m-%d"),
-            "views": int(daily_views) if daily_views else 0
-        })
-    
-    # 最近7天的文章发布趋势
-    publish_trend = []
-    for i in range(7):
-        day = seven_days_ago + timedelta(days=i)
-        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-        
-        daily_posts = db.query(func.count(Content.id)).filter(
-            Content.content_type == 'post',
-            Content.created_at >= day_start,
-            Content.created_at < day_end
-        ).scalar() or 0
-        
-        publish_trend.append({
-            "date": day_start.strftime("%Y-%m-%d"),
-            "count": int(daily_posts) if daily_posts else 0
-        })
+    cached = stats_cache.get("dashboard")
+    if cached is not None:
+        return cached
+    
+    # 汇总数据(一条语句)
+    summary = (await db.execute(
+        select(
+            select(func.count(User.id)).scalar_subquery(),
+            func.count().filter(Content.content_type == 'post'),
+            select(func.count(Comment.id)).scalar_subquery(),
+            func.coalesce(func.sum(Content.view_count), 0)
+        ).select_from(Content)
+    )).one()
+    total_users, total_posts, total_comments, total_views = summary
+    
+    # 最近7天的浏览量和文章发布趋势
+    trend = await get_daily_trend(db)
+    view_trend = [{"date": day["date"], "views": day["views"]} for day in trend]
+    publish_trend = [{"date": day["date"], "count": day["posts"]} for day in trend]
     
     # 最近5篇文章
-    recent_posts = db.query(Content).filter(
-        Content.content_type == 'post'
-    ).order_by(Content.created_at.desc()).limit(5).all()
+    recent_posts = (await db.scalars(
+        select(Content).where(
+            Content.content_type == 'post'
+        ).order_by(Content.created_at.desc()).limit(5)
+    )).all()
     
     recent_posts_data = [
         {
@@ -85,9 +104,11 @@ async def get_dashboard_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
     ]
     
     # 最近5条评论
-    recent_comments = db.query(Comment).order_by(
-        Comment.created_at.desc()
-    ).limit(5).all()
+    recent_comments = (await db.scalars(
+        select(Comment).order_by(
+            Comment.created_at.desc()
+        ).limit(5)
+    )).all()
     
     recent_comments_data = [
         {
@@ -100,53 +121,64 @@ async def get_dashboard_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
         for comment in recent_comments
     ]
     
-    return {
+    result = {
         "summary": {
             "total_users": total_users,
             "total_posts": total_posts,
             "total_comments": total_comments,
-            "total_views": int(total_views) if total_views else 0
+            "total_views": int(total_views)
         },
         "view_trend": view_trend,
         "publish_trend": publish_trend,
         "recent_posts": recent_posts_data,
         "recent_comments": recent_comments_data
     }
+    stats_cache.set("dashboard", result)
+    return result
 
 
 @router.get("/overview")
-async def get_overview_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
+async def get_overview_stats(db: AsyncSession = Depends(get_async_db)) -> Dict[str, Any]:
     """获取概览统计数据"""
+    cached = stats_cache.get("overview")
+    if cached is not None:
+        return cached
     
     # 内容统计
-    total_content = db.query(func.count(Content.id)).scalar() or 0
-    published_content = db.query(func.count(Content.id)).filter(
-        Content.status == 'published'
-    ).scalar() or 0
-    draft_content = db.query(func.count(Content.id)).filter(
-        Content.status == 'draft'
-    ).scalar() or 0
+    total_content, published_content, draft_content = (await db.execute(
+        select(
+            func.count(),
+            func.count().filter(Content.status == 'published'),
+            func.count().filter(Content.status == 'draft')
+        ).select_from(Content)
+    )).one()
     
     # 用户统计
-    total_users = db.query(func.count(User.id)).scalar() or 0
-    active_users = db.query(func.count(User.id)).filter(
-        User.status == 'active'
-    ).scalar() or 0
+    total_users, active_users = (await db.execute(
+        select(
+            func.count(),
+            func.count().filter(User.is_active == True)
+        ).select_from(User)
+    )).one()
     
     # 评论统计
-    total_comments = db.query(func.count(Comment.id)).scalar() or 0
-    approved_comments = db.query(func.count(Comment.id)).filter(
-        Comment.status == 'approved'
-    ).scalar() or 0
-    pending_comments = db.query(func.count(Comment.id)).filter(
-        Comment.status == 'pending'
-    ).scalar() or 0
+    total_comments, approved_comments, pending_comments = (await db.execute(
+        select(
+            func.count(),
+            func.count().filter(Comment.status == 'approved'),
+            func.count().filter(Comment.status == 'pending')
+        ).select_from(Comment)
+    )).one()
     
     # 媒体统计
-    total_media = db.query(func.count(Media.id)).scalar() or 0
-    total_media_size = db.query(func.sum(Media.file_size)).scalar() or 0
-    
-    return {
+    total_media, total_media_size = (await db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(Media.file_size), 0)
+        ).select_from(Media)
+    )).one()
+    
+    result = {
         "content": {
             "total": total_content,
             "published": published_content,
@@ -163,6 +195,8 @@ async def get_overview_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
         },
         "media": {
             "total": total_media,
-            "total_size": int(total_media_size) if total_media_size else 0
+            "total_size": int(total_media_size)
         }
     }
+    stats_cache.set("overview", result)
+    return result
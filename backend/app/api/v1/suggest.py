@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Optional
+from ...schemas.suggest import SuggestResult
+from ...schemas.user import UserPrincipal
+from ...core.security import get_current_active_user
+from ...core.suggest import suggest_index, KINDS
+
+router = APIRouter()
+
+
+@router.get("", response_model=List[SuggestResult])
+async def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    types: Optional[str] = Query(None, description="逗号分隔: content,term,user"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """输入建议(内容标题、术语名称、用户显示名的前缀匹配)"""
+    kinds = KINDS
+    if types:
+        kinds = [kind.strip() for kind in types.split(",") if kind.strip()]
+        invalid = [kind for kind in kinds if kind not in KINDS]
+        if invalid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"不支持的建议类型: {', '.join(invalid)}"
+            )
+    
+    return suggest_index.search(q, kinds, limit)
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ...database import get_db
+from ...database import get_async_db
 from ...models.user import User
-from ...schemas.user import UserResponse, UserUpdate
+from ...schemas.user import UserResponse, UserUpdate, UserPrincipal
 from ...core.security import get_current_active_user
+from ...core.auth_cache import principal_cache
+from ...core.pagination import paginate
+from ...core.suggest import suggest_index, KIND_USER, user_entry
 import uuid
 
 router = APIRouter()
@@ -12,49 +16,68 @@ router = APIRouter()
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取当前用户信息"""
-    return current_user
+    user = await db.scalar(select(User).where(User.id == current_user.id))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在"
+        )
+    return user
 
 
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新当前用户信息"""
+    user = await db.scalar(select(User).where(User.id == current_user.id))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在"
+        )
+    
     update_data = user_update.dict(exclude_unset=True)
     
     for field, value in update_data.items():
-        setattr(current_user, field, value)
+        setattr(user, field, value)
+    
+    await db.commit()
+    await db.refresh(user)
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    # 使认证缓存失效
+    await principal_cache.invalidate(user.id)
+    suggest_index.upsert(KIND_USER, user_entry(user.id, user.display_name, user.username))
+    return user
 
 
 @router.get("", response_model=List[UserResponse])
 async def list_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取用户列表"""
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    return await paginate(db, select(User), User, response, limit, skip, cursor)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: uuid.UUID,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取指定用户信息"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
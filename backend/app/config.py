@@ -31,10 +31,84 @@ class Settings(BaseSettings):
     # 文件上传配置
     UPLOAD_DIR: str = "uploads"
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 1048576  # 分块写入大小(1MB)
+    MEDIA_STORAGE_MODE: str = "dated"  # dated: 按年月目录保存; content: 按内容哈希保存并去重
+    
+    # 图片处理配置
+    IMAGE_WORKERS: int = 2  # 进程池大小
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 640, 1024, 1920]  # 衍生图片宽度
+    IMAGE_VARIANT_FORMATS: List[str] = ["webp", "jpeg"]  # 衍生图片格式(webp/jpeg)
+    IMAGE_VARIANT_QUALITY: int = 82
+    IMAGE_TRANSFORM_MAX_WIDTH: int = 2560  # 按需缩放允许的最大宽度
+    IMAGE_CACHE_DIR: str = "cache/images"  # 按需缩放结果的磁盘缓存目录
+    IMAGE_CACHE_MAX_BYTES: int = 536870912  # 磁盘缓存容量上限(512MB)
+    IMAGE_CACHE_MAX_AGE: int = 31536000  # 缩放结果的Cache-Control max-age(秒)
     
     # Redis配置(可选)
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # 浏览计数缓冲配置
+    VIEW_COUNT_FLUSH_INTERVAL: float = 10.0  # 刷新间隔(秒)
+    VIEW_COUNT_MAX_BUFFER: int = 1000  # 缓冲达到该次数时立即刷新
+    VIEW_COUNT_USE_REDIS: bool = False  # 使用Redis在多个worker间共享缓冲
+    
+    # 统计数据缓存时间(秒)
+    STATS_CACHE_TTL: int = 30
+    
+    # 每日统计压缩配置
+    STATS_COMPACT_INTERVAL: float = 60.0  # 压缩间隔(秒)
+    STATS_COMPACT_LOOKBACK_DAYS: int = 2  # 每次重新汇总的天数
+    STATS_CONTENT_RETENTION_DAYS: int = 90  # 内容每日统计保留天数
+    
+    # 定时发布配置
+    SCHEDULED_PUBLISH_BATCH_SIZE: int = 100  # 每批认领发布的内容数
+    SCHEDULED_PUBLISH_MAX_SLEEP: float = 60.0  # 最长休眠时间(秒),用于发现其他副本写入的定时内容
+    
+    # 认证用户缓存配置
+    AUTH_CACHE_TTL: float = 60.0  # 缓存有效期(秒)
+    AUTH_CACHE_MAXSIZE: int = 10000  # 最多缓存的用户数
+    AUTH_CACHE_USE_REDIS: bool = False  # 通过Redis发布订阅通知所有worker失效
+    
+    # 密码哈希线程池配置
+    PASSWORD_HASH_WORKERS: int = 2  # 线程数
+    PASSWORD_HASH_MAX_PENDING: int = 32  # 排队上限,超过时返回503
+    
+    # HTTP缓存配置(公开读接口)
+    HTTP_CACHE_MAX_AGE: int = 60  # Cache-Control max-age(秒)
+    HTTP_CACHE_STALE_WHILE_REVALIDATE: int = 300  # 过期后允许先返回旧内容再后台刷新的时间(秒)
+    HTTP_CACHE_MODULE_TYPES_MAX_AGE: int = 600  # 模块类型很少变化,缓存更久
+    
+    # 全文检索配置
+    SEARCH_DEFAULT_CONFIG: str = "simple"  # 新内容默认的文本搜索配置
+    SEARCH_CONFIGS: List[str] = ["simple", "english"]  # 搜索时同时使用的配置,覆盖内容中用到的全部配置
+    
+    # 内容批量导入导出配置
+    CONTENT_IMPORT_BATCH_SIZE: int = 500  # 每批校验和写入的行数
+    CONTENT_EXPORT_BATCH_SIZE: int = 500  # 服务端游标每批读取的行数
+    
+    # 评论配置
+    COMMENT_MAX_DEPTH: int = 5  # 回复的最大嵌套层级,更深的回复显示为同级
+    COMMENT_DEFAULT_STATUS: str = "pending"  # 新评论的默认状态
+    COMMENT_QUEUE_BATCH_SIZE: int = 200  # 每批从队列写入的评论数
+    COMMENT_QUEUE_POLL_INTERVAL: float = 1.0  # 队列空闲时的轮询间隔(秒)
+    COMMENT_SPAM_SCORER: str = "app.core.comment_queue:heuristic_spam_score"  # 垃圾评论评分函数(模块路径:函数名)
+    COMMENT_SPAM_THRESHOLD: float = 0.8  # 评分达到该值时标记为spam
+    COMMENT_SPAM_WORDS: List[str] = []  # 屏蔽词
+    
+    # 系统选项配置
+    OPTIONS_LAZY_MAXSIZE: int = 1000  # 非自动加载选项的LRU缓存条目数
+    OPTIONS_LAZY_TTL: float = 3600.0  # 非自动加载选项的缓存有效期(秒),变更通知会立即清空缓存
+    OPTIONS_PUBLIC_MAX_AGE: int = 300  # /options/public 的 Cache-Control max-age(秒)
+    
+    # 输入建议索引配置
+    SUGGEST_MAX_ENTRIES: int = 200000  # 每种类型最多收录的条目数
+    SUGGEST_RECONCILE_INTERVAL: float = 600.0  # 与数据库全量对账的间隔(秒)
+    
+    # 响应缓存配置
+    RESPONSE_CACHE_TTL: float = 300.0  # 条目有效期(秒)
+    RESPONSE_CACHE_MAXSIZE: int = 2000  # 本进程最多缓存的条目数
+    RESPONSE_CACHE_USE_REDIS: bool = False  # 使用Redis作为多个worker共享的第二层缓存
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,161 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import select, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..schemas.user import UserPrincipal
+from .cache import TTLCache
+from .pg_listen import listen
+
+# 用户缓存失效通知的Redis频道
+REDIS_INVALIDATE_CHANNEL = "cms:auth:invalidate"
+# 角色和权限变更通知的频道(由roles、permissions、user_roles、role_permissions上的触发器发送)
+RBAC_NOTIFY_CHANNEL = "cms_rbac"
+
+
+async def load_principal(db: AsyncSession, user_id: uuid.UUID) -> Optional[UserPrincipal]:
+    """从数据库加载用户及其有效角色和权限"""
+    from ..models.user import User, Role, Permission, UserRole, RolePermission
+    
+    user = (await db.execute(
+        select(User.id, User.is_active).where(User.id == user_id)
+    )).first()
+    if user is None:
+        return None
+    
+    rows = (await db.execute(
+        select(Role.name, Permission.name, UserRole.expires_at)
+        .select_from(UserRole)
+        .join(Role, Role.id == UserRole.role_id)
+        .outerjoin(RolePermission, RolePermission.role_id == Role.id)
+        .outerjoin(Permission, Permission.id == RolePermission.permission_id)
+        .where(
+            UserRole.user_id == user_id,
+            or_(UserRole.expires_at.is_(None), UserRole.expires_at > func.now())
+        )
+    )).all()
+    
+    expirations = [expires_at for _, _, expires_at in rows if expires_at]
+    return UserPrincipal(
+        id=user.id,
+        is_active=user.is_active,
+        roles=frozenset(role for role, _, _ in rows),
+        permissions=frozenset(permission for _, permission, _ in rows if permission),
+        roles_expire_at=min(expirations) if expirations else None
+    )
+
+
+class PrincipalCache:
+    """已认证用户缓存
+    
+    按用户id缓存认证所需的最小信息(包括编译好的角色和权限集合),命中时认证不访问数据库。
+    用户资料变更或被禁用时显式失效,开启Redis时通过发布订阅通知所有worker。
+    角色或权限的任何变更都会通过数据库通知递增version并清空缓存;条目记录写入时的version,
+    version变化前开始加载、变化后才写入的旧权限不会被使用。角色到期后条目也随之失效。
+    """
+    
+    def __init__(self, ttl: float, maxsize: int, redis_url: Optional[str] = None):
+        self._cache = TTLCache(ttl=ttl, maxsize=maxsize)
+        self.redis_url = redis_url
+        self.version = 0
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+        self._rbac_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """监听角色权限变更,连接Redis并订阅失效通知"""
+        self._rbac_task = asyncio.create_task(
+            listen(RBAC_NOTIFY_CHANNEL, self._on_rbac_notify, self._on_rbac_connect)
+        )
+        if not self.redis_url:
+            return
+        try:
+            from redis import asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url)
+            await self._redis.ping()
+        except Exception as e:
+            print(f"用户缓存Redis不可用,仅在本进程内失效: {e}")
+            self._redis = None
+            return
+        self._task = asyncio.create_task(self._listen())
+    
+    async def stop(self):
+        """停止订阅"""
+        for task in (self._task, self._rbac_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._rbac_task = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+    
+    async def _listen(self):
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(REDIS_INVALIDATE_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    self._cache.invalidate(uuid.UUID(message["data"].decode()))
+                except ValueError:
+                    pass
+        finally:
+            await pubsub.close()
+    
+    def _on_rbac_notify(self, payload: str):
+        self.bump_version()
+    
+    async def _on_rbac_connect(self):
+        # 监听连接断开期间可能错过了变更
+        self.bump_version()
+    
+    def bump_version(self):
+        """角色或权限发生变化,使所有缓存的用户失效"""
+        self.version += 1
+        self._cache.invalidate()
+    
+    def get(self, user_id: uuid.UUID) -> Optional[UserPrincipal]:
+        """获取缓存的用户"""
+        item = self._cache.get(user_id)
+        if item is None:
+            return None
+        version, principal = item
+        if version != self.version:
+            return None
+        if principal.roles_expire_at and principal.roles_expire_at <= datetime.now(timezone.utc):
+            self._cache.invalidate(user_id)
+            return None
+        return principal
+    
+    def set(self, principal: UserPrincipal, version: int):
+        """缓存用户(version为开始加载时的self.version)"""
+        if version == self.version:
+            self._cache.set(principal.id, (version, principal))
+    
+    async def invalidate(self, user_id: uuid.UUID):
+        """使指定用户的缓存失效(开启Redis时同步到所有worker)"""
+        self._cache.invalidate(user_id)
+        if self._redis is not None:
+            try:
+                await self._redis.publish(REDIS_INVALIDATE_CHANNEL, str(user_id))
+            except Exception as e:
+                print(f"用户缓存失效通知发送失败: {e}")
+    
+    def clear(self):
+        """清空本进程的缓存"""
+        self._cache.invalidate()
+
+
+principal_cache = PrincipalCache(
+    ttl=settings.AUTH_CACHE_TTL,
+    maxsize=settings.AUTH_CACHE_MAXSIZE,
+    redis_url=settings.REDIS_URL if settings.AUTH_CACHE_USE_REDIS else None
+)
@@ -0,0 +1,41 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """进程内TTL缓存
+    
+    条目在写入ttl秒后失效,超过maxsize时淘汰最久未使用的条目。
+    """
+    
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存值,不存在或已过期时返回None"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: Hashable, value: Any):
+        """写入缓存值"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def invalidate(self, key: Optional[Hashable] = None):
+        """删除指定条目,不传key时清空缓存"""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
@@ -0,0 +1,259 @@
+import asyncio
+import importlib
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import select, delete, update, insert, bindparam, text
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.comment import Comment, CommentSubmission
+from ..models.content import Content
+from .comments import APPROVED, resolve_parent
+from .stats_rollup import add_daily_comments
+
+# 垃圾评论评分函数: 接收一条待写入的评论(dict),返回0到1之间的分数
+SpamScorer = Callable[[Dict[str, Any]], float]
+
+# 本批中已准备写入的评论: id -> (内容id, 父评论id, 深度)
+PreparedComments = Dict[uuid.UUID, Tuple[uuid.UUID, Optional[uuid.UUID], int]]
+
+LINK_PATTERN = re.compile(r"https?://|www\.", re.IGNORECASE)
+
+# 回复对象仍在队列中(其他副本正在处理)时,回复重新排队等待下一批
+REQUEUE = object()
+
+
+def heuristic_spam_score(comment: Dict[str, Any]) -> float:
+    """默认的本地启发式评分: 链接数量、屏蔽词、全大写和重复字符"""
+    body = comment["content"]
+    score = 0.0
+    
+    links = len(LINK_PATTERN.findall(body))
+    score += min(links, 4) * 0.2
+    if comment.get("author_url") and links:
+        score += 0.1
+    
+    lowered = body.lower()
+    if any(word.lower() in lowered for word in settings.COMMENT_SPAM_WORDS):
+        score += 0.6
+    
+    letters = [c for c in body if c.isalpha()]
+    if len(letters) >= 20 and sum(c.isupper() for c in letters) / len(letters) > 0.7:
+        score += 0.2
+    if re.search(r"(.)\1{9,}", body):
+        score += 0.2
+    
+    return min(score, 1.0)
+
+
+def load_scorer(path: str) -> SpamScorer:
+    """按 模块路径:函数名 加载评分函数"""
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class CommentIngestor:
+    """评论写入队列的后台处理任务
+    
+    提交的评论先写入comment_queue表并立即返回;本任务用FOR UPDATE SKIP LOCKED按批认领
+    (多个副本可同时运行),评分后批量写入comments表,并在同一事务中按内容汇总更新
+    comment_count、每日统计和父评论的reply_count,每批每篇内容只更新一次。
+    事务中设置cms.comment_batch,使逐行维护计数的触发器跳过这些插入。
+    回复对象可以是同一批中更早提交的评论。
+    """
+    
+    def __init__(self, batch_size: int, poll_interval: float, scorer: SpamScorer, spam_threshold: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.scorer = scorer
+        self.spam_threshold = spam_threshold
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.processed = 0
+        self.spam = 0
+        self.dropped = 0
+        self.requeued = 0
+        self.last_lag: Optional[float] = None
+    
+    async def start(self):
+        """启动后台处理任务"""
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """停止后台处理任务"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def wake(self):
+        """有新提交时立即处理,不等待下一次轮询"""
+        self._wakeup.set()
+    
+    async def _resolve_parent(self, db, submission, prepared: PreparedComments, requeued: Set[uuid.UUID]):
+        """确定回复对象,返回(父评论id, 新评论的深度),顶层评论为(None, 0)
+        
+        回复对象在本批中已准备写入时不查询数据库。回复对象仍在队列中(包括本批中重新排队的)时返回REQUEUE;
+        不存在或不属于该内容时返回None。
+        """
+        if not submission.payload.get("parent_id"):
+            return None, 0
+        parent_id = uuid.UUID(submission.payload["parent_id"])
+        
+        if parent_id in prepared:
+            content_id, grandparent_id, parent_depth = prepared[parent_id]
+            if content_id != submission.content_id:
+                return None
+            if parent_depth + 1 <= settings.COMMENT_MAX_DEPTH:
+                return parent_id, parent_depth + 1
+            # 本批中的评论深度不超过上限,超出时改为回复其父评论(与回复对象同级)
+            return grandparent_id, parent_depth
+        if parent_id in requeued:
+            return REQUEUE
+        
+        resolved = await resolve_parent(db, submission.content_id, parent_id)
+        if resolved is not None:
+            return resolved
+        if await db.scalar(select(CommentSubmission.id).where(CommentSubmission.id == parent_id)):
+            return REQUEUE
+        return None
+    
+    def _prepare(self, submission, parent_id: Optional[uuid.UUID]) -> Dict[str, Any]:
+        """把提交转换为comments表的一行"""
+        payload = submission.payload
+        row = {
+            "id": submission.id,
+            "content_id": submission.content_id,
+            "parent_id": parent_id,
+            "author_name": payload["author_name"],
+            "author_email": payload["author_email"],
+            "author_url": payload.get("author_url"),
+            "author_ip": payload["author_ip"],
+            "user_agent": payload.get("user_agent"),
+            "content": payload["content"],
+            "created_at": submission.created_at,
+            "approved_at": None
+        }
+        score = self.scorer(row)
+        row["meta_data"] = {"spam_score": round(score, 3)}
+        row["status"] = "spam" if score >= self.spam_threshold else settings.COMMENT_DEFAULT_STATUS
+        if row["status"] == APPROVED:
+            row["approved_at"] = datetime.now(timezone.utc)
+        return row
+    
+    async def process_batch(self) -> int:
+        """认领并写入一批评论,返回处理掉的提交数量(不含重新排队的)"""
+        claim = (
+            select(CommentSubmission.id)
+            .order_by(CommentSubmission.created_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SET LOCAL cms.comment_batch = 'on'"))
+            submissions = (await db.execute(
+                delete(CommentSubmission)
+                .where(CommentSubmission.id.in_(claim))
+                .returning(CommentSubmission.id, CommentSubmission.content_id,
+                           CommentSubmission.payload, CommentSubmission.created_at)
+            )).all()
+            if not submissions:
+                return 0
+            
+            # 提交后内容被删除或撤回的评论直接丢弃
+            published = set((await db.scalars(
+                select(Content.id).where(
+                    Content.id.in_({s.content_id for s in submissions}),
+                    Content.status == 'published'
+                )
+            )).all())
+            rows = []
+            requeued = []
+            prepared: PreparedComments = {}
+            for submission in sorted(submissions, key=lambda s: s.created_at):
+                parent = None
+                if submission.content_id in published:
+                    parent = await self._resolve_parent(db, submission, prepared, {s.id for s in requeued})
+                if parent is REQUEUE:
+                    requeued.append(submission)
+                    continue
+                if parent is None:
+                    self.dropped += 1
+                    continue
+                parent_id, depth = parent
+                rows.append(self._prepare(submission, parent_id))
+                prepared[submission.id] = (submission.content_id, parent_id, depth)
+            
+            if requeued:
+                await db.execute(insert(CommentSubmission), [
+                    {"id": s.id, "content_id": s.content_id, "payload": s.payload, "created_at": s.created_at}
+                    for s in requeued
+                ])
+            
+            if rows:
+                await db.execute(insert(Comment), rows)
+                
+                approved = [row for row in rows if row["status"] == APPROVED]
+                comment_counts = Counter(row["content_id"] for row in approved)
+                reply_counts = Counter(row["parent_id"] for row in approved if row["parent_id"])
+                if comment_counts:
+                    await db.execute(
+                        update(Content.__table__)
+                        .where(Content.__table__.c.id == bindparam("target_id"))
+                        .values(comment_count=Content.__table__.c.comment_count + bindparam("delta")),
+                        [{"target_id": id, "delta": n} for id, n in comment_counts.items()]
+                    )
+                    await add_daily_comments(db, comment_counts)
+                if reply_counts:
+                    await db.execute(
+                        update(Comment.__table__)
+                        .where(Comment.__table__.c.id == bindparam("target_id"))
+                        .values(reply_count=Comment.__table__.c.reply_count + bindparam("delta")),
+                        [{"target_id": id, "delta": n} for id, n in reply_counts.items()]
+                    )
+            await db.commit()
+        
+        now = datetime.now(timezone.utc)
+        self.processed += len(rows)
+        self.requeued += len(requeued)
+        self.spam += sum(1 for row in rows if row["status"] == "spam")
+        self.last_lag = max((now - s.created_at).total_seconds() for s in submissions)
+        return len(submissions) - len(requeued)
+    
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                while await self.process_batch() == self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"评论队列处理失败: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    def metrics(self) -> Dict[str, Any]:
+        """处理数量和排队延迟(秒)"""
+        return {
+            "processed": self.processed,
+            "spam": self.spam,
+            "dropped": self.dropped,
+            "requeued": self.requeued,
+            "last_lag_seconds": self.last_lag
+        }
+
+
+comment_ingestor = CommentIngestor(
+    batch_size=settings.COMMENT_QUEUE_BATCH_SIZE,
+    poll_interval=settings.COMMENT_QUEUE_POLL_INTERVAL,
+    scorer=load_scorer(settings.COMMENT_SPAM_SCORER),
+    spam_threshold=settings.COMMENT_SPAM_THRESHOLD
+)
@@ -0,0 +1,249 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import select, update, func, literal_column, cast, tuple_, Text
+from sqlalchemy.dialects.postgresql import array, ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from ..config import settings
+from ..models.comment import Comment
+
+APPROVED = "approved"
+
+
+def _encode(value: Any) -> str:
+    raw = json.dumps(value).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> Any:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+
+def encode_thread_cursor(comment: Comment) -> str:
+    """线程游标: 顶层评论的(是否置顶, 创建时间, id)"""
+    return _encode([bool(comment.is_pinned), comment.created_at.isoformat(), str(comment.id)])
+
+
+def decode_thread_cursor(cursor: str) -> Tuple[bool, datetime, uuid.UUID]:
+    value = _decode(cursor)
+    try:
+        is_pinned, created_at, id = value
+        return bool(is_pinned), datetime.fromisoformat(created_at), uuid.UUID(id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+
+def decode_path_cursor(cursor: str) -> List[str]:
+    """回复游标: 上一页最后一条回复在树中的路径"""
+    value = _decode(cursor)
+    if not isinstance(value, list) or not all(isinstance(part, str) for part in value):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+    return value
+
+
+def _segment(comment):
+    """路径中的一段: UTC创建时间(微秒)加id,按文本排序即按时间先后排序"""
+    created = func.to_char(func.timezone("UTC", comment.created_at), "YYYYMMDDHH24MISSUS")
+    return created.op("||")(cast(comment.id, Text))
+
+
+def thread_tree(anchor, max_depth: int):
+    """从anchor(评论id列表或子查询)出发的递归CTE,列出每棵子树的全部已审核评论
+    
+    每行包含所在子树的根(root_id)、相对深度和路径(各级segment组成的数组),
+    按路径排序即为树的先序遍历。深度超过max_depth的评论不会被展开。
+    """
+    tree = (
+        select(
+            Comment.id,
+            Comment.id.label("root_id"),
+            literal_column("0").label("depth"),
+            array([_segment(Comment)]).label("path")
+        )
+        .where(Comment.id.in_(anchor))
+        .cte("comment_tree", recursive=True)
+    )
+    reply = aliased(Comment)
+    return tree.union_all(
+        select(
+            reply.id,
+            tree.c.root_id,
+            tree.c.depth + 1,
+            tree.c.path.op("||")(array([_segment(reply)]))
+        )
+        .where(
+            reply.parent_id == tree.c.id,
+            reply.status == APPROVED,
+            tree.c.depth < max_depth
+        )
+    )
+
+
+async def load_threads(
+    db: AsyncSession,
+    content_id: uuid.UUID,
+    limit: int,
+    replies: int,
+    cursor: Optional[str] = None,
+    max_depth: int = settings.COMMENT_MAX_DEPTH
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """一条查询加载一页评论线程,返回(线程列表, 下一页游标)
+    
+    顶层评论按(置顶, 创建时间, id)倒序键集分页;每个线程最多带replies条回复(按先序排列),
+    其余回复通过load_replies按路径继续分页。
+    """
+    roots = select(Comment.id).where(
+        Comment.content_id == content_id,
+        Comment.parent_id.is_(None),
+        Comment.status == APPROVED
+    )
+    if cursor:
+        roots = roots.where(
+            tuple_(Comment.is_pinned, Comment.created_at, Comment.id) < tuple_(*decode_thread_cursor(cursor))
+        )
+    roots = roots.order_by(
+        Comment.is_pinned.desc(), Comment.created_at.desc(), Comment.id.desc()
+    ).limit(limit + 1)
+    
+    tree = thread_tree(roots, max_depth)
+    ranked = select(
+        tree.c.id,
+        tree.c.root_id,
+        tree.c.depth,
+        tree.c.path,
+        func.row_number().over(partition_by=tree.c.root_id, order_by=tree.c.path).label("position"),
+        func.count().over(partition_by=tree.c.root_id).label("thread_size")
+    ).subquery()
+    rows = (await db.execute(
+        select(Comment, ranked.c.root_id, ranked.c.depth, ranked.c.path, ranked.c.thread_size)
+        .join(ranked, ranked.c.id == Comment.id)
+        .where(ranked.c.position <= replies + 1)
+        .order_by(ranked.c.path)
+    )).all()
+    
+    # 按先序排列时根总在其回复之前
+    threads: Dict[uuid.UUID, Dict[str, Any]] = {}
+    for comment, root_id, depth, path, thread_size in rows:
+        if depth == 0:
+            threads[root_id] = {
+                "comment": comment,
+                "replies": [],
+                "reply_total": thread_size - 1,
+                "replies_cursor": None
+            }
+        else:
+            thread = threads[root_id]
+            thread["replies"].append((comment, depth))
+            # 还有未加载的回复时,从本页最后一条回复继续
+            more = len(thread["replies"]) < thread["reply_total"]
+            thread["replies_cursor"] = _encode(path) if more else None
+    
+    ordered = sorted(
+        threads.values(),
+        key=lambda t: (bool(t["comment"].is_pinned), t["comment"].created_at, t["comment"].id),
+        reverse=True
+    )
+    next_cursor = None
+    if len(ordered) > limit:
+        ordered = ordered[:limit]
+        next_cursor = encode_thread_cursor(ordered[-1]["comment"])
+    return ordered, next_cursor
+
+
+async def load_replies(
+    db: AsyncSession,
+    comment_id: uuid.UUID,
+    limit: int,
+    cursor: Optional[str] = None,
+    max_depth: int = settings.COMMENT_MAX_DEPTH
+) -> Tuple[List[Tuple[Comment, int]], Optional[str]]:
+    """按先序分页加载某条评论下的全部回复,返回([(评论, 相对深度)], 下一页游标)"""
+    tree = thread_tree([comment_id], max_depth)
+    query = (
+        select(Comment, tree.c.depth, tree.c.path)
+        .join(tree, tree.c.id == Comment.id)
+        .where(tree.c.depth > 0)
+    )
+    if cursor:
+        query = query.where(tree.c.path > cast(decode_path_cursor(cursor), ARRAY(Text)))
+    rows = (await db.execute(query.order_by(tree.c.path).limit(limit + 1))).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode(rows[-1].path)
+    return [(comment, depth) for comment, depth, _ in rows], next_cursor
+
+
+async def resolve_parent(
+    db: AsyncSession,
+    content_id: uuid.UUID,
+    parent_id: uuid.UUID,
+    max_depth: int = settings.COMMENT_MAX_DEPTH
+) -> Optional[Tuple[uuid.UUID, int]]:
+    """校验回复对象,超过深度限制时改为回复最深允许层级上的祖先(与其同级显示)
+    
+    返回(实际的父评论id, 新评论的深度);回复对象不存在或不属于该内容时返回None。
+    """
+    ancestors = select(
+        Comment.id, Comment.parent_id, Comment.content_id, literal_column("0").label("step")
+    ).where(Comment.id == parent_id).cte("comment_ancestors", recursive=True)
+    parent = aliased(Comment)
+    ancestors = ancestors.union_all(
+        select(parent.id, parent.parent_id, parent.content_id, ancestors.c.step + 1)
+        .where(parent.id == ancestors.c.parent_id)
+    )
+    chain = (await db.execute(select(ancestors.c.id, ancestors.c.content_id, ancestors.c.step))).all()
+    if not chain or chain[0].content_id != content_id:
+        return None
+    
+    # 回复对象的深度等于其祖先数量,新评论的深度为其加一
+    steps = {row.step: row.id for row in chain}
+    parent_depth = max(steps)
+    if parent_depth + 1 <= max_depth:
+        return parent_id, parent_depth + 1
+    return steps[parent_depth - max_depth + 1], max_depth
+
+
+async def adjust_reply_count(db: AsyncSession, parent_id: Optional[uuid.UUID], delta: int):
+    """在当前事务中调整父评论的reply_count(只统计已审核的直接回复)"""
+    if parent_id is None or not delta:
+        return
+    await db.execute(
+        update(Comment)
+        .where(Comment.id == parent_id)
+        .values(reply_count=Comment.reply_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def set_comment_status(db: AsyncSession, comment: Comment, new_status: str, moderator_id: uuid.UUID):
+    """修改评论状态,审核状态变化时同步父评论的reply_count(由调用方提交)"""
+    old_status = comment.status
+    if new_status == old_status:
+        return
+    comment.status = new_status
+    if new_status == APPROVED:
+        comment.approved_by = moderator_id
+        comment.approved_at = datetime.utcnow()
+    
+    if old_status == APPROVED:
+        await adjust_reply_count(db, comment.parent_id, -1)
+    elif new_status == APPROVED:
+        await adjust_reply_count(db, comment.parent_id, 1)
@@ -0,0 +1,202 @@
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from ..config import settings
+from ..database import AsyncSessionLocal
+from .slugs import base_slug, allocate_slugs
+from .search import available_search_configs
+
+# 单行NDJSON的最大长度
+MAX_LINE_BYTES = 10 * 1048576
+# 导入结果中最多返回的错误数
+MAX_REPORTED_ERRORS = 100
+# slug冲突(并发写入)时的重试次数
+INSERT_ATTEMPTS = 3
+
+
+def row_error(error: Exception) -> str:
+    """单行写入失败时的错误描述(取数据库驱动的原始异常信息)"""
+    orig = getattr(error, "orig", None)
+    cause = getattr(orig, "__cause__", None) or orig or error
+    message = str(cause).strip().splitlines()[0]
+    detail = getattr(cause, "detail", None)
+    return f"{message} ({detail})" if detail else message
+
+
+async def ndjson_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """把字节流拆分为(行号, 行内容),跳过空行"""
+    buffer = b""
+    line_no = 0
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, line
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f"第{line_no + 1}行超过长度限制({MAX_LINE_BYTES} bytes)")
+    if buffer.strip():
+        yield line_no + 1, buffer
+
+
+class ContentImporter:
+    """NDJSON批量导入内容
+    
+    每批用ContentCreate校验,一条查询解决整批的slug冲突,executemany写入后立即提交,
+    内存占用只与批次大小有关。违反约束的行(如parent_id不存在)计入错误报告,不影响同批其他行。
+    """
+    
+    def __init__(self, author_id: uuid.UUID, batch_size: int = settings.CONTENT_IMPORT_BATCH_SIZE):
+        self.author_id = author_id
+        self.batch_size = batch_size
+        self.imported = 0
+        self.failed = 0
+        self.renamed = 0
+        self.errors: List[Dict[str, Any]] = []
+    
+    def _error(self, line_no: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "error": error})
+    
+    def _row(self, data) -> Dict[str, Any]:
+        row = data.dict(exclude={"slug", "search_config", "meta_data"})
+        row.update(
+            id=uuid.uuid4(),
+            author_id=self.author_id,
+            search_config=data.search_config or settings.SEARCH_DEFAULT_CONFIG,
+            meta_data=data.meta_data
+        )
+        if row["status"] == "published":
+            row.setdefault("published_at", datetime.utcnow())
+        return row
+    
+    async def _insert_rows(self, db, pending, rows) -> Tuple[Set[uuid.UUID], Set[uuid.UUID]]:
+        """写入一批行,返回(已插入的id, 出错的id)
+        
+        整批在SAVEPOINT中写入;有行违反slug以外的约束时回滚这一批,
+        再逐行在各自的SAVEPOINT中写入,把出错的行记入错误报告。
+        """
+        from ..models.content import Content
+        
+        stmt = insert(Content).on_conflict_do_nothing(index_elements=["slug"]).returning(Content.id)
+        try:
+            async with db.begin_nested():
+                return set((await db.execute(stmt, rows)).scalars().all()), set()
+        except (IntegrityError, DataError):
+            pass
+        
+        inserted, failed = set(), set()
+        for (line_no, _, _), row in zip(pending, rows):
+            try:
+                async with db.begin_nested():
+                    inserted.update((await db.execute(stmt, [row])).scalars().all())
+            except (IntegrityError, DataError) as e:
+                failed.add(row["id"])
+                self._error(line_no, row_error(e))
+        return inserted, failed
+    
+    async def _insert(self, db, pending: List[Tuple[int, str, Dict[str, Any]]]):
+        from ..models.content import Content
+        
+        for _ in range(INSERT_ATTEMPTS):
+            slugs = await allocate_slugs(db, Content.slug, [base for _, base, _ in pending])
+            rows = [{**row, "slug": slug} for (_, _, row), slug in zip(pending, slugs)]
+            
+            # 并发写入抢占了slug的行不会插入,重新分配后重试
+            inserted, failed = await self._insert_rows(db, pending, rows)
+            self.imported += len(inserted)
+            self.renamed += sum(
+                1 for (_, base, _), row in zip(pending, rows)
+                if row["id"] in inserted and row["slug"] != base
+            )
+            pending = [
+                item for item, row in zip(pending, rows)
+                if row["id"] not in inserted and row["id"] not in failed
+            ]
+            if not pending:
+                return
+        for line_no, _, _ in pending:
+            self._error(line_no, "slug冲突,重试后仍无法写入")
+    
+    async def _flush(self, batch: List[Tuple[int, bytes]]):
+        from ..schemas.content import ContentCreate
+        
+        pending = []
+        for line_no, line in batch:
+            try:
+                data = ContentCreate.model_validate_json(line)
+            except ValidationError as e:
+                error = e.errors()[0]
+                location = ".".join(str(part) for part in error["loc"])
+                self._error(line_no, f"{location}: {error['msg']}" if location else error["msg"])
+                continue
+            pending.append((line_no, base_slug(data.slug or data.title), self._row(data)))
+        if not pending:
+            return
+        
+        async with AsyncSessionLocal() as db:
+            # 不存在的文本搜索配置会让search_vector触发器中的::regconfig转换失败,一条查询校验整批
+            configs = await available_search_configs(db, {row["search_config"] for _, _, row in pending})
+            valid = []
+            for line_no, base, row in pending:
+                if row["search_config"] in configs:
+                    valid.append((line_no, base, row))
+                else:
+                    self._error(line_no, f"search_config: 不支持的文本搜索配置: {row['search_config']}")
+            if valid:
+                await self._insert(db, valid)
+            await db.commit()
+    
+    async def run(self, stream: AsyncIterator[bytes]) -> Dict[str, Any]:
+        batch: List[Tuple[int, bytes]] = []
+        async for line_no, line in ndjson_lines(stream):
+            batch.append((line_no, line))
+            if len(batch) >= self.batch_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+        return self.summary()
+    
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "renamed": self.renamed,
+            "errors": self.errors
+        }
+
+
+async def export_ndjson(
+    content_type: Optional[str] = None,
+    status: Optional[str] = None,
+    batch_size: int = settings.CONTENT_EXPORT_BATCH_SIZE
+) -> AsyncIterator[bytes]:
+    """以NDJSON流式导出内容
+    
+    使用服务端游标按批读取,每次只在内存中保留一批记录。
+    """
+    from ..models.content import Content
+    from ..schemas.content import ContentResponse
+    
+    query = select(Content).order_by(Content.created_at, Content.id)
+    if content_type:
+        query = query.where(Content.content_type == content_type)
+    if status:
+        query = query.where(Content.status == status)
+    
+    async with AsyncSessionLocal() as db:
+        result = await db.stream_scalars(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield b"".join(
+                ContentResponse.model_validate(content).model_dump_json(by_alias=True).encode() + b"\n"
+                for content in partition
+            )
+            # 已输出的对象不再需要,避免身份映射随导出增长
+            db.expunge_all()
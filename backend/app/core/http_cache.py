@@ -0,0 +1,97 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+from fastapi import Request, Response
+from ..config import settings
+
+
+def make_etag(versions: Iterable[Tuple[Any, Optional[datetime]]]) -> Tuple[str, Optional[datetime]]:
+    """根据(id, updated_at)序列计算弱ETag和最后修改时间"""
+    digest = hashlib.blake2b(digest_size=16)
+    last_modified = None
+    for id, updated_at in versions:
+        digest.update(f"{id}:{updated_at.isoformat() if updated_at else ''};".encode())
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    return f'W/"{digest.hexdigest()}"', last_modified
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match使用弱比较
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """判断条件请求是否可以返回304(If-None-Match优先于If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP日期精确到秒
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def cache_headers(
+    etag: str,
+    last_modified: Optional[datetime],
+    max_age: int = settings.HTTP_CACHE_MAX_AGE,
+    stale_while_revalidate: int = settings.HTTP_CACHE_STALE_WHILE_REVALIDATE
+) -> Dict[str, str]:
+    """公开读接口的缓存相关响应头"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}"
+    }
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    versions: Iterable[Tuple[Any, Optional[datetime]]],
+    max_age: int = settings.HTTP_CACHE_MAX_AGE,
+    stale_while_revalidate: int = settings.HTTP_CACHE_STALE_WHILE_REVALIDATE
+) -> Optional[Response]:
+    """处理公开读接口的条件请求
+    
+    在序列化响应体之前调用:未修改时返回304响应,否则把ETag、Last-Modified
+    和Cache-Control写入response并返回None,由接口继续返回数据。
+    """
+    etag, last_modified = make_etag(versions)
+    headers = cache_headers(etag, last_modified, max_age, stale_while_revalidate)
+    
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return None
+
+
+def json_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    last_modified: Optional[datetime],
+    max_age: int = settings.HTTP_CACHE_MAX_AGE,
+    stale_while_revalidate: int = settings.HTTP_CACHE_STALE_WHILE_REVALIDATE
+) -> Response:
+    """直接返回已经序列化好的JSON响应体,同样支持条件请求"""
+    headers = cache_headers(etag, last_modified, max_age, stale_while_revalidate)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import stat
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+import anyio
+from starlette.datastructures import Headers, QueryParams
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Scope
+from ..config import settings
+from .images import VARIANT_FORMATS, render_to, run_in_pool
+
+
+class DerivativeCache:
+    """按需缩放图片的磁盘缓存
+    
+    缓存文件名由源文件(路径、大小、修改时间)和缩放参数哈希得到,源文件变化后自然失效。
+    按总字节数限制容量,超出时淘汰最久未访问的文件;同一结果的并发请求只渲染一次。
+    """
+    
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        # 缓存键 -> 文件大小,按访问顺序排列
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._paths: Dict[str, str] = {}
+        self._total = 0
+        self._loaded = False
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+    
+    @staticmethod
+    def cache_key(source_path: str, stat_result: os.stat_result, width: int, fmt: str, quality: int) -> str:
+        raw = f"{source_path}:{stat_result.st_size}:{stat_result.st_mtime_ns}:{width}:{fmt}:{quality}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+    
+    def cache_path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}{VARIANT_FORMATS[fmt][1]}")
+    
+    def _scan(self):
+        """扫描已有的缓存文件,按修改时间恢复访问顺序"""
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                key, ext = os.path.splitext(name)
+                if ext == ".tmp" or "." in key:
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, key, path, st.st_size))
+        return sorted(found)
+    
+    async def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        for _, key, path, size in await asyncio.to_thread(self._scan):
+            self._add(key, path, size)
+    
+    def _add(self, key: str, path: str, size: int):
+        if key in self._entries:
+            self._total -= self._entries[key]
+        self._entries[key] = size
+        self._entries.move_to_end(key)
+        self._paths[key] = path
+        self._total += size
+    
+    def _forget(self, key: str):
+        self._total -= self._entries.pop(key, 0)
+        self._paths.pop(key, None)
+    
+    async def _evict(self):
+        """超出容量时淘汰最久未访问的文件(保留刚写入的一个)"""
+        removed = []
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, _ = next(iter(self._entries.items()))
+            removed.append(self._paths[key])
+            self._forget(key)
+            self._evictions += 1
+        for path in removed:
+            try:
+                await asyncio.to_thread(os.remove, path)
+            except OSError:
+                pass
+    
+    async def _render(self, key: str, source_path: str, path: str, width: int, fmt: str, quality: int):
+        self._misses += 1
+        info = await run_in_pool(render_to, source_path, path, width, fmt, quality)
+        self._add(key, path, info["file_size"])
+        await self._evict()
+    
+    async def get(self, source_path: str, stat_result: os.stat_result, width: int, fmt: str) -> Tuple[str, str]:
+        """返回(缓存文件路径, 缓存键),缓存未命中时在进程池中渲染"""
+        await self._load()
+        quality = settings.IMAGE_VARIANT_QUALITY
+        key = self.cache_key(source_path, stat_result, width, fmt, quality)
+        path = self.cache_path(key, fmt)
+        
+        task = self._inflight.get(key)
+        if task is None:
+            # 其他worker可能已经渲染或淘汰了这个文件,以磁盘为准
+            try:
+                size = (await asyncio.to_thread(os.stat, path)).st_size
+            except OSError:
+                self._forget(key)
+            else:
+                self._hits += 1
+                self._add(key, path, size)
+                return path, key
+            
+            task = asyncio.ensure_future(self._render(key, source_path, path, width, fmt, quality))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._coalesced += 1
+        
+        # 客户端断开不应取消其他请求共享的渲染任务
+        await asyncio.shield(task)
+        return path, key
+    
+    def metrics(self) -> Dict[str, Any]:
+        """缓存运行指标"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "evictions": self._evictions,
+            "rendering": len(self._inflight)
+        }
+
+
+derivative_cache = DerivativeCache(root=settings.IMAGE_CACHE_DIR, max_bytes=settings.IMAGE_CACHE_MAX_BYTES)
+
+
+class ImageStaticFiles(StaticFiles):
+    """上传文件静态服务,支持按需缩放图片
+    
+    带w或fmt查询参数的图片请求(如 /uploads/2024/01/a.jpg?w=640&fmt=webp)
+    返回缩放并重新编码后的结果,其他请求按普通静态文件处理。
+    """
+    
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        params = QueryParams(scope["query_string"])
+        if "w" not in params and "fmt" not in params:
+            return await super().get_response(path, scope)
+        
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+        
+        try:
+            width = int(params.get("w", settings.IMAGE_TRANSFORM_MAX_WIDTH))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="无效的图片宽度")
+        if not 1 <= width <= settings.IMAGE_TRANSFORM_MAX_WIDTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"图片宽度需在1到{settings.IMAGE_TRANSFORM_MAX_WIDTH}之间"
+            )
+        fmt = params.get("fmt", "webp")
+        if fmt not in VARIANT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"不支持的图片格式: {fmt}")
+        
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+        if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404)
+        mime_type, _ = mimetypes.guess_type(full_path)
+        if not mime_type or not mime_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail="只有图片支持缩放")
+        
+        try:
+            cached_path, key = await derivative_cache.get(full_path, stat_result, width, fmt)
+        except OSError:
+            raise HTTPException(status_code=400, detail="无法处理该图片")
+        
+        # 相同缓存键对应完全相同的字节,可以使用强ETag和长期缓存
+        response = FileResponse(
+            cached_path,
+            media_type=f"image/{fmt}",
+            method=scope["method"],
+            headers={
+                "etag": f'"{key}"',
+                "cache-control": f"public, max-age={settings.IMAGE_CACHE_MAX_AGE}, immutable"
+            }
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,315 @@
+import asyncio
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+from PIL import Image, ImageOps, ExifTags
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..database import AsyncSessionLocal
+
+# 衍生图片保存目录(位于上传目录下)
+VARIANT_DIR = "variants"
+
+# 支持的输出格式: 名称 -> (Pillow格式, 扩展名)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _pool
+
+
+def shutdown_pool():
+    """关闭图片处理进程池"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def run_in_pool(fn, *args):
+    """在图片处理进程池中执行CPU密集的任务"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), fn, *args)
+
+
+def variant_key(media) -> str:
+    """衍生图片目录名:优先使用内容哈希,相同内容的媒体共享衍生图片"""
+    return media.content_hash or str(media.id)
+
+
+def variant_path(key: str, width: int, fmt: str) -> str:
+    """衍生图片路径: UPLOAD_DIR/variants/<key>/w<width><ext>"""
+    return os.path.join(settings.UPLOAD_DIR, VARIANT_DIR, key, f"w{width}{VARIANT_FORMATS[fmt][1]}")
+
+
+def variant_url(key: str, width: int, fmt: str) -> str:
+    """衍生图片的静态访问URL"""
+    return f"/uploads/{VARIANT_DIR}/{key}/w{width}{VARIANT_FORMATS[fmt][1]}"
+
+
+def remove_variants(key: str):
+    """删除某个文件的全部衍生图片"""
+    shutil.rmtree(os.path.join(settings.UPLOAD_DIR, VARIANT_DIR, key), ignore_errors=True)
+
+
+def list_variants(media) -> List[Dict[str, Any]]:
+    """媒体的衍生图片列表
+    
+    已生成的尺寸指向静态文件,尚未生成的尺寸指向按需生成接口。
+    """
+    if not media.mime_type or not media.mime_type.startswith("image/") or not media.width:
+        return []
+    
+    generated = {
+        (item["width"], item["format"]): item
+        for item in (media.meta_data or {}).get("variants", [])
+    }
+    variants = []
+    for width in settings.IMAGE_VARIANT_WIDTHS:
+        if width >= media.width:
+            continue
+        for fmt in settings.IMAGE_VARIANT_FORMATS:
+            item = generated.get((width, fmt))
+            if item is None:
+                item = {
+                    "width": width,
+                    "height": round(media.height * width / media.width) if media.height else None,
+                    "format": fmt,
+                    "url": f"/api/v1/media/{media.id}/variants/{width}/{fmt}",
+                    "file_size": None,
+                    "generated": False
+                }
+            variants.append(item)
+    return variants
+
+
+# 以下函数在子进程中执行,只接收和返回可序列化的简单数据
+
+def _exif_value(value):
+    if isinstance(value, (int, float, str)):
+        return value.strip("\x00") if isinstance(value, str) else value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def probe_image(path: str) -> Dict[str, Any]:
+    """读取图片尺寸和EXIF(已按方向标记校正宽高)"""
+    with Image.open(path) as img:
+        width, height = img.size
+        exif = img.getexif()
+        if exif.get(0x0112) in (5, 6, 7, 8):
+            width, height = height, width
+        
+        tags = {}
+        for tag_id, value in exif.items():
+            name = ExifTags.TAGS.get(tag_id)
+            if name is None or name == "MakerNote":
+                continue
+            value = _exif_value(value)
+            if value is not None:
+                tags[name] = value
+        
+        return {"width": width, "height": height, "format": img.format, "exif": tags}
+
+
+def _save(img: Image.Image, dest: str, fmt: str, quality: int) -> Dict[str, Any]:
+    pil_format = VARIANT_FORMATS[fmt][0]
+    if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    temp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+    img.save(temp_path, pil_format, quality=quality, optimize=True)
+    os.replace(temp_path, dest)
+    return {"width": img.width, "height": img.height, "file_size": os.path.getsize(dest)}
+
+
+def _load_for_width(path: str, width: int) -> Image.Image:
+    """解码图片,JPEG使用draft模式按目标尺寸直接缩小解码"""
+    img = Image.open(path)
+    if img.format == "JPEG":
+        img.draft("RGB", (width, width * 4))
+    img = ImageOps.exif_transpose(img)
+    img.load()
+    return img
+
+
+def render_variants(path: str, key: str, widths: List[int], formats: List[str], quality: int) -> List[Dict[str, Any]]:
+    """生成一组衍生图片:只解码一次,从大到小逐级缩放"""
+    widths = sorted(widths, reverse=True)
+    if not widths:
+        return []
+    
+    results = []
+    img = _load_for_width(path, widths[0])
+    try:
+        for width in widths:
+            if width >= img.width:
+                continue
+            height = round(img.height * width / img.width)
+            img = img.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                info = _save(img, variant_path(key, width, fmt), fmt, quality)
+                info.update({"width": width, "format": fmt, "url": variant_url(key, width, fmt), "generated": True})
+                results.append(info)
+    finally:
+        img.close()
+    return results
+
+
+def render_to(path: str, dest: str, width: int, fmt: str, quality: int) -> Dict[str, Any]:
+    """按目标宽度生成任意尺寸的图片(不放大)"""
+    img = _load_for_width(path, width)
+    try:
+        if width < img.width:
+            img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+        return _save(img, dest, fmt, quality)
+    finally:
+        img.close()
+
+
+def render_variant(path: str, key: str, width: int, fmt: str, quality: int) -> Optional[Dict[str, Any]]:
+    """生成单个衍生图片"""
+    results = render_variants(path, key, [width], [fmt], quality)
+    return results[0] if results else None
+
+
+# 以下函数在事件循环中执行,负责调度进程池并写回数据库
+
+def _existing_variant(key: str, width: int, height: int, fmt: str) -> Optional[Dict[str, Any]]:
+    path = variant_path(key, width, fmt)
+    if not os.path.exists(path):
+        return None
+    return {
+        "width": width,
+        "height": height,
+        "format": fmt,
+        "url": variant_url(key, width, fmt),
+        "file_size": os.path.getsize(path),
+        "generated": True
+    }
+
+
+def _merge_variants(existing: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    merged = {(item["width"], item["format"]): item for item in existing}
+    merged.update({(item["width"], item["format"]): item for item in new})
+    return sorted(merged.values(), key=lambda item: (item["width"], item["format"]))
+
+
+async def _record_variants(db: AsyncSession, media_id: uuid.UUID, variants: List[Dict[str, Any]], **fields):
+    """在行锁下合并衍生图片记录,避免并发生成时互相覆盖"""
+    from ..models.media import Media
+    
+    media = await db.scalar(
+        select(Media)
+        .where(Media.id == media_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    if media is None:
+        return None
+    for field, value in fields.items():
+        setattr(media, field, value)
+    meta_data = dict(media.meta_data or {})
+    meta_data["variants"] = _merge_variants(meta_data.get("variants", []), variants)
+    media.meta_data = meta_data
+    await db.commit()
+    return media
+
+
+async def process_image(media_id: uuid.UUID):
+    """上传后的图片处理:读取尺寸和EXIF,生成配置的全部衍生图片
+    
+    解码和编码在进程池中执行,由上传接口作为后台任务调用。
+    """
+    from ..models.media import Media, MediaMetadata
+    
+    async with AsyncSessionLocal() as db:
+        media = await db.scalar(select(Media).where(Media.id == media_id))
+        if media is None:
+            return
+        path, key = media.file_path, variant_key(media)
+    
+    try:
+        info = await run_in_pool(probe_image, path)
+    except Exception as e:
+        print(f"图片解析失败 {media_id}: {e}")
+        return
+    
+    # 同内容的文件可能已经生成过衍生图片,只补齐缺失的尺寸
+    variants, missing = [], []
+    for width in settings.IMAGE_VARIANT_WIDTHS:
+        if width >= info["width"]:
+            continue
+        height = round(info["height"] * width / info["width"])
+        found = [
+            await asyncio.to_thread(_existing_variant, key, width, height, fmt)
+            for fmt in settings.IMAGE_VARIANT_FORMATS
+        ]
+        if all(found):
+            variants.extend(found)
+        else:
+            missing.append(width)
+    
+    if missing:
+        try:
+            variants.extend(await run_in_pool(
+                render_variants, path, key, missing,
+                settings.IMAGE_VARIANT_FORMATS, settings.IMAGE_VARIANT_QUALITY
+            ))
+        except Exception as e:
+            print(f"衍生图片生成失败 {media_id}: {e}")
+    
+    async with AsyncSessionLocal() as db:
+        media = await _record_variants(db, media_id, variants, width=info["width"], height=info["height"])
+        if media is None:
+            return
+        stmt = insert(MediaMetadata).values(media_id=media_id, meta_key="exif", meta_value=info["exif"])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[MediaMetadata.media_id, MediaMetadata.meta_key],
+            set_={"meta_value": stmt.excluded.meta_value}
+        ))
+        await db.commit()
+
+
+async def release_variants(db: AsyncSession, media):
+    """删除媒体记录前调用:没有其他记录共享同一组衍生图片时删除它们"""
+    from ..models.media import Media
+    
+    if media.content_hash:
+        references = await db.scalar(
+            select(func.count()).select_from(Media).where(
+                Media.content_hash == media.content_hash,
+                Media.id != media.id
+            )
+        )
+        if references:
+            return
+    await asyncio.to_thread(remove_variants, variant_key(media))
+
+
+async def ensure_variant(db: AsyncSession, media, width: int, fmt: str) -> Optional[str]:
+    """返回指定尺寸衍生图片的文件路径,尚未生成时在进程池中生成"""
+    key = variant_key(media)
+    path = variant_path(key, width, fmt)
+    if await asyncio.to_thread(os.path.exists, path):
+        return path
+    
+    item = await run_in_pool(render_variant, media.file_path, key, width, fmt, settings.IMAGE_VARIANT_QUALITY)
+    if item is None:
+        return None
+    await _record_variants(db, media.id, [item])
+    return path
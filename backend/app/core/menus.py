@@ -0,0 +1,106 @@
+import asyncio
+from typing import Any, Dict, Optional, Set
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..schemas.module import MenuItemNode, MenuTree
+from .pg_listen import listen
+from .response_cache import response_cache, make_entry, menu_tag, menu_location_tag
+
+# 菜单变更通知的频道(由menus和menu_items上的触发器发送,内容为需要失效的缓存标签)
+NOTIFY_CHANNEL = "cms_menus"
+# 所有菜单缓存条目共有的标签
+MENUS_TAG = "menus"
+
+
+async def build_menu_tree(db: AsyncSession, location: str) -> Optional[Dict[str, Any]]:
+    """构建某个位置的菜单树缓存条目,该位置没有启用的菜单时返回None
+    
+    一条查询取出菜单和全部启用的菜单项(按item_order排序),再在内存中一次遍历组装成树。
+    父菜单项被停用时,其下的菜单项一并隐藏。
+    """
+    from ..models.module import Menu, MenuItem
+    
+    # 同一位置有多个启用的菜单时使用最近更新的一个
+    menu_id = (
+        select(Menu.id)
+        .where(Menu.location == location, Menu.is_active == True)
+        .order_by(Menu.updated_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    rows = (await db.execute(
+        select(Menu, MenuItem)
+        .outerjoin(MenuItem, (MenuItem.menu_id == Menu.id) & (MenuItem.is_active == True))
+        .where(Menu.id == menu_id)
+        .order_by(MenuItem.item_order, MenuItem.id)
+    )).all()
+    if not rows:
+        return None
+    
+    menu = rows[0][0]
+    items = [item for _, item in rows if item is not None]
+    nodes = {
+        item.id: MenuItemNode(
+            id=item.id,
+            title=item.title,
+            url=item.url,
+            target=item.target,
+            css_classes=item.css_classes,
+            icon_class=item.icon_class,
+            item_order=item.item_order or 0
+        )
+        for item in items
+    }
+    roots = []
+    for item in items:
+        if item.parent_id is None:
+            roots.append(nodes[item.id])
+        elif item.parent_id in nodes:
+            nodes[item.parent_id].children.append(nodes[item.id])
+    
+    tree = MenuTree(id=menu.id, name=menu.name, slug=menu.slug, location=location, items=roots)
+    versions = [(menu.id, menu.updated_at)] + [(item.id, item.updated_at) for item in items]
+    return make_entry(
+        tree.model_dump_json().encode(),
+        versions,
+        [MENUS_TAG, menu_tag(menu.id), menu_location_tag(location)]
+    )
+
+
+class MenuCacheInvalidator:
+    """监听菜单变更通知并使对应的缓存条目失效
+    
+    失效由数据库触发器驱动,任何途径对menus和menu_items的写入都会生效。
+    """
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+        self.invalidations = 0
+    
+    async def start(self):
+        """开始监听"""
+        self._task = asyncio.create_task(listen(NOTIFY_CHANNEL, self._on_notify, self._on_connect))
+    
+    async def stop(self):
+        """停止监听"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def _on_notify(self, payload: str):
+        self.invalidations += 1
+        task = asyncio.get_running_loop().create_task(response_cache.invalidate_tags([payload]))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def _on_connect(self):
+        # 监听连接断开期间可能错过了变更,清空所有菜单缓存
+        await response_cache.invalidate_tags([MENUS_TAG])
+
+
+menu_cache_invalidator = MenuCacheInvalidator()
@@ -0,0 +1,54 @@
+import time
+import uuid
+from typing import Dict, Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..schemas.module import ModuleTypeResponse
+
+# 缓存有效期(秒),用于让其他worker中的新增/修改最终可见
+MODULE_TYPE_CACHE_TTL = 300
+
+
+class ModuleTypeCache:
+    """模块类型进程级缓存
+    
+    模块类型几乎不变,整表加载一次后按id查找,
+    缓存未命中(例如其他worker新建了类型)或过期时整表重新加载。
+    """
+    
+    def __init__(self, ttl: float = MODULE_TYPE_CACHE_TTL):
+        self.ttl = ttl
+        self._types: Dict[uuid.UUID, ModuleTypeResponse] = {}
+        self._loaded_at: Optional[float] = None
+    
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+    
+    async def _reload(self, db: AsyncSession):
+        from ..models.module import ModuleType
+        
+        module_types = (await db.scalars(select(ModuleType))).all()
+        self._types = {
+            module_type.id: ModuleTypeResponse.model_validate(module_type)
+            for module_type in module_types
+        }
+        self._loaded_at = time.monotonic()
+    
+    async def get_many(
+        self,
+        db: AsyncSession,
+        type_ids: Iterable[uuid.UUID]
+    ) -> Dict[uuid.UUID, ModuleTypeResponse]:
+        """批量获取模块类型,命中缓存时不访问数据库"""
+        type_ids = set(type_ids)
+        if not self._is_fresh() or not type_ids.issubset(self._types):
+            await self._reload(db)
+        return {type_id: self._types[type_id] for type_id in type_ids if type_id in self._types}
+    
+    def invalidate(self):
+        """清空缓存,下次访问时重新加载"""
+        self._types = {}
+        self._loaded_at = None
+
+
+module_type_cache = ModuleTypeCache()
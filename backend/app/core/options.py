@@ -0,0 +1,169 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, List, Mapping, Optional, Tuple
+from sqlalchemy import select, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..database import AsyncSessionLocal
+from .cache import TTLCache
+from .http_cache import make_etag
+from .pg_listen import listen
+
+# 选项变更通知的频道(由options表上的语句级触发器发送,内容为递增后的版本号)
+NOTIFY_CHANNEL = "cms_options"
+
+# 懒加载缓存中表示"选项不存在"的标记
+# (缓存值包装为单元素元组,选项值为JSON null时与未命中区分)
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class OptionsSnapshot:
+    """某一版本的自动加载选项(只读)
+    
+    每次重新加载都会生成新的快照并整体替换引用,读取方无需加锁。
+    """
+    version: int = 0
+    values: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    public: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    public_body: bytes = b"{}"
+    public_etag: str = 'W/"0"'
+    public_last_modified: Optional[datetime] = None
+
+
+class OptionsService:
+    """系统选项服务
+    
+    启动时把autoload = true的选项(以及所有公开选项)加载为只读快照,查找只是一次字典读取;
+    其他选项首次访问时从数据库读取并放入LRU缓存。
+    options表的任何写入都会通过触发器递增版本号并发送NOTIFY,每个worker收到后重新加载。
+    """
+    
+    def __init__(self, lazy_maxsize: int, lazy_ttl: float):
+        self.snapshot = OptionsSnapshot()
+        self._lazy = TTLCache(ttl=lazy_ttl, maxsize=lazy_maxsize)
+        self._reload_requested = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+        self.lazy_hits = 0
+        self.lazy_misses = 0
+    
+    async def start(self):
+        """加载快照并开始监听变更通知(每次连上LISTEN连接后都会重新加载,补上断开期间的变更)"""
+        try:
+            await self.reload()
+        except Exception as e:
+            print(f"选项加载失败: {e}")
+        self._tasks = [
+            asyncio.create_task(self._run()),
+            asyncio.create_task(listen(NOTIFY_CHANNEL, self._on_notify, self._request_reload))
+        ]
+    
+    async def stop(self):
+        """停止监听"""
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+    
+    async def _request_reload(self):
+        self._reload_requested.set()
+    
+    async def _load(self, db: AsyncSession) -> OptionsSnapshot:
+        from ..models.module import Option
+        
+        version = await db.scalar(text("SELECT last_value FROM options_version_seq"))
+        rows = (await db.execute(
+            select(Option.option_name, Option.option_value, Option.autoload, Option.is_public, Option.updated_at)
+            .where(or_(Option.autoload == True, Option.is_public == True))
+            .order_by(Option.option_name)
+        )).all()
+        
+        public = {row.option_name: row.option_value for row in rows if row.is_public}
+        etag, last_modified = make_etag((row.option_name, row.updated_at) for row in rows if row.is_public)
+        return OptionsSnapshot(
+            version=version,
+            values=MappingProxyType({row.option_name: row.option_value for row in rows if row.autoload}),
+            public=MappingProxyType(public),
+            public_body=json.dumps(public, ensure_ascii=False).encode(),
+            public_etag=etag,
+            public_last_modified=last_modified
+        )
+    
+    async def reload(self):
+        """重新加载快照并清空懒加载缓存"""
+        async with self._lock:
+            async with AsyncSessionLocal() as db:
+                snapshot = await self._load(db)
+            self._lazy.invalidate()
+            self.snapshot = snapshot
+            self.reloads += 1
+    
+    def _on_notify(self, payload: str):
+        # 序列不受事务约束,版本号可能早于数据提交就被读到,所以收到通知总是重新加载;
+        # 连续的多条通知会合并为一次加载
+        self._reload_requested.set()
+    
+    async def _run(self):
+        while True:
+            await self._reload_requested.wait()
+            self._reload_requested.clear()
+            try:
+                await self.reload()
+            except Exception as e:
+                print(f"选项重新加载失败: {e}")
+    
+    async def get(self, name: str, default: Any = None) -> Any:
+        """读取选项: 先查快照,再查懒加载缓存,都未命中时查询数据库"""
+        snapshot = self.snapshot
+        if name in snapshot.values:
+            return snapshot.values[name]
+        if name in snapshot.public:
+            return snapshot.public[name]
+        
+        cached = self._lazy.get(name)
+        if cached is not None:
+            self.lazy_hits += 1
+            value, = cached
+            return default if value is _MISSING else value
+        
+        self.lazy_misses += 1
+        from ..models.module import Option
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(Option.option_value).where(Option.option_name == name)
+            )).first()
+        value = row.option_value if row else _MISSING
+        # 查询期间版本已变化时不缓存,避免写入旧值
+        if self.snapshot is snapshot:
+            self._lazy.set(name, (value,))
+        return default if value is _MISSING else value
+    
+    def public_response(self) -> Tuple[bytes, str, Optional[datetime]]:
+        """公开选项的响应体(预先序列化)、ETag和最后修改时间"""
+        snapshot = self.snapshot
+        return snapshot.public_body, snapshot.public_etag, snapshot.public_last_modified
+    
+    def metrics(self):
+        """快照版本和缓存命中情况"""
+        return {
+            "version": self.snapshot.version,
+            "autoload": len(self.snapshot.values),
+            "public": len(self.snapshot.public),
+            "reloads": self.reloads,
+            "lazy_hits": self.lazy_hits,
+            "lazy_misses": self.lazy_misses
+        }
+
+
+options_service = OptionsService(
+    lazy_maxsize=settings.OPTIONS_LAZY_MAXSIZE,
+    lazy_ttl=settings.OPTIONS_LAZY_TTL
+)
@@ -0,0 +1,62 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 下一页游标通过响应头返回,保持列表响应体的格式不变
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id: uuid.UUID) -> str:
+    """把(created_at, id)编码为不透明游标"""
+    raw = json.dumps([created_at.isoformat(), str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """解码游标,格式错误时返回400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    model: Any,
+    response: Response,
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None
+) -> List[Any]:
+    """按(created_at, id)倒序分页
+    
+    传入cursor时使用键集分页(忽略skip),否则保持offset分页。
+    两种模式都会在还有下一页时通过响应头返回下一页游标。
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.where(tuple_(model.created_at, model.id) < tuple_(created_at, last_id))
+    elif skip:
+        query = query.offset(skip)
+    
+    # 多取一条用于判断是否还有下一页
+    rows = (await db.scalars(query.limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    
+    return rows
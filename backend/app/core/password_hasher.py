@@ -0,0 +1,90 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from fastapi import HTTPException, status
+from ..config import settings
+from .security import verify_password, get_password_hash
+
+
+class PasswordHasher:
+    """密码哈希线程池
+    
+    bcrypt每次计算约数百毫秒CPU,放在固定大小的线程池中执行以免阻塞事件循环;
+    排队数超过上限时直接拒绝,避免登录突发流量拖垮整个worker。
+    """
+    
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hash_total = 0.0
+        self._hash_max = 0.0
+    
+    async def _run(self, fn: Callable[..., Any], *args) -> Any:
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="服务器繁忙,请稍后重试",
+                headers={"Retry-After": "1"}
+            )
+        
+        submitted_at = time.perf_counter()
+        
+        def job():
+            started_at = time.perf_counter()
+            result = fn(*args)
+            return result, started_at - submitted_at, time.perf_counter() - started_at
+        
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, wait_time, hash_time = await loop.run_in_executor(self._executor, job)
+        finally:
+            self._pending -= 1
+        
+        self._completed += 1
+        self._wait_total += wait_time
+        self._wait_max = max(self._wait_max, wait_time)
+        self._hash_total += hash_time
+        self._hash_max = max(self._hash_max, hash_time)
+        return result
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """在线程池中验证密码"""
+        return await self._run(verify_password, plain_password, hashed_password)
+    
+    async def hash(self, password: str) -> str:
+        """在线程池中计算密码哈希"""
+        return await self._run(get_password_hash, password)
+    
+    def metrics(self) -> Dict[str, Any]:
+        """线程池运行指标(时间单位为秒)"""
+        completed = self._completed or 1
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "wait_avg": self._wait_total / completed,
+            "wait_max": self._wait_max,
+            "hash_avg": self._hash_total / completed,
+            "hash_max": self._hash_max
+        }
+    
+    def shutdown(self):
+        """关闭线程池"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Awaitable, Callable
+from ..database import async_engine
+
+# 监听连接断开后重连前等待的秒数
+RECONNECT_DELAY = 5.0
+
+
+async def listen(
+    channel: str,
+    on_notify: Callable[[str], None],
+    on_connect: Callable[[], Awaitable[None]],
+    reconnect_delay: float = RECONNECT_DELAY
+):
+    """保持一个PostgreSQL LISTEN连接,收到通知时以payload调用on_notify
+    
+    每次连上(包括断线重连)后调用on_connect,用于补上未连接期间错过的变更。
+    在后台任务中运行,直到任务被取消。
+    """
+    while True:
+        try:
+            async with async_engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                listener = raw.driver_connection
+                closed = asyncio.Event()
+                
+                def callback(connection, pid, channel, payload):
+                    on_notify(payload)
+                
+                listener.add_termination_listener(lambda connection: closed.set())
+                await listener.add_listener(channel, callback)
+                try:
+                    await on_connect()
+                    await closed.wait()
+                finally:
+                    if not closed.is_set():
+                        await listener.remove_listener(channel, callback)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"数据库通知监听失败({channel}): {e}")
+        await asyncio.sleep(reconnect_delay)
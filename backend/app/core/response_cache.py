@@ -0,0 +1,292 @@
+import asyncio
+import json
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+from ..config import settings
+from .http_cache import make_etag
+
+# Redis中的键前缀和失效通知频道
+REDIS_KEY_PREFIX = "cms:resp:"
+REDIS_TAG_PREFIX = "cms:resp:tag:"
+REDIS_INVALIDATE_CHANNEL = "cms:resp:invalidate"
+
+
+def content_tag(content_id) -> str:
+    return f"content:{content_id}"
+
+
+def content_modules_tag(content_id) -> str:
+    return f"content_modules:{content_id}"
+
+
+def module_tag(module_id) -> str:
+    return f"module:{module_id}"
+
+
+def module_type_tag(type_id) -> str:
+    return f"module_type:{type_id}"
+
+
+def media_tag(media_id) -> str:
+    return f"media:{media_id}"
+
+
+def menu_tag(menu_id) -> str:
+    return f"menu:{menu_id}"
+
+
+def menu_location_tag(location) -> str:
+    return f"menu_location:{location}"
+
+
+def media_refs(value: Any) -> Set[str]:
+    """找出JSON数据中引用的媒体id(所有UUID格式的字符串)"""
+    refs = set()
+    if isinstance(value, dict):
+        for item in value.values():
+            refs |= media_refs(item)
+    elif isinstance(value, list):
+        for item in value:
+            refs |= media_refs(item)
+    elif isinstance(value, str) and len(value) == 36:
+        try:
+            refs.add(str(uuid.UUID(value)))
+        except ValueError:
+            pass
+    return refs
+
+
+def make_entry(
+    body: bytes,
+    versions: Iterable,
+    tags: Iterable[str],
+    meta: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """构造缓存条目:序列化后的响应体、ETag、依赖的标签和附加信息"""
+    etag, last_modified = make_etag(versions)
+    return {
+        "body": body.decode(),
+        "etag": etag,
+        "last_modified": last_modified.isoformat() if last_modified else None,
+        "tags": sorted(set(tags)),
+        "meta": meta or {}
+    }
+
+
+def entry_last_modified(entry: Dict[str, Any]) -> Optional[datetime]:
+    return datetime.fromisoformat(entry["last_modified"]) if entry["last_modified"] else None
+
+
+class ResponseCache:
+    """按标签失效的响应缓存
+    
+    条目按路由和参数作为键,缓存序列化好的JSON响应体,并记录它依赖的
+    内容、模块、模块类型和媒体标签。写操作按标签精确清除相关条目。
+    本进程内为LRU,开启Redis时作为第二层在多个worker间共享,
+    并通过发布订阅同步清除各worker的本地条目。
+    """
+    
+    def __init__(self, ttl: float, maxsize: int, redis_url: Optional[str] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.redis_url = redis_url
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+        # 键 -> (过期时间, 条目),按访问顺序排列
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # 每次失效加一,构建期间发生过失效的结果不写入缓存
+        self._generation = 0
+        self._hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._invalidations = 0
+    
+    async def start(self):
+        """连接Redis并订阅失效通知"""
+        if not self.redis_url:
+            return
+        try:
+            from redis import asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url)
+            await self._redis.ping()
+        except Exception as e:
+            print(f"响应缓存Redis不可用,仅使用本进程缓存: {e}")
+            self._redis = None
+            return
+        self._task = asyncio.create_task(self._listen())
+    
+    async def stop(self):
+        """停止订阅"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+    
+    async def _listen(self):
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(REDIS_INVALIDATE_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    self._invalidate_local(json.loads(message["data"]))
+        finally:
+            await pubsub.close()
+    
+    def _loop_time(self) -> float:
+        return asyncio.get_running_loop().time()
+    
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at <= self._loop_time():
+            self._remove_local(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+    
+    def _set_local(self, key: str, entry: Dict[str, Any]):
+        self._remove_local(key)
+        self._entries[key] = (self._loop_time() + self.ttl, entry)
+        for tag in entry["tags"]:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove_local(oldest)
+            self._evictions += 1
+    
+    def _remove_local(self, key: str):
+        item = self._entries.pop(key, None)
+        if item is None:
+            return
+        for tag in item[1]["tags"]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+    
+    def _invalidate_local(self, tags: Iterable[str]):
+        self._generation += 1
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._remove_local(key)
+    
+    async def _get_redis(self, key: str) -> Optional[Dict[str, Any]]:
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(REDIS_KEY_PREFIX + key)
+        except Exception as e:
+            print(f"响应缓存读取Redis失败: {e}")
+            return None
+        return json.loads(raw) if raw else None
+    
+    async def _set_redis(self, key: str, entry: Dict[str, Any]):
+        if self._redis is None:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.set(REDIS_KEY_PREFIX + key, json.dumps(entry), ex=int(self.ttl))
+                for tag in entry["tags"]:
+                    pipe.sadd(REDIS_TAG_PREFIX + tag, key)
+                    pipe.expire(REDIS_TAG_PREFIX + tag, int(self.ttl))
+                await pipe.execute()
+        except Exception as e:
+            print(f"响应缓存写入Redis失败: {e}")
+    
+    async def _build(
+        self,
+        key: str,
+        build: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        entry = await self._get_redis(key)
+        if entry is not None:
+            self._redis_hits += 1
+            self._set_local(key, entry)
+            return entry
+        
+        self._misses += 1
+        generation = self._generation
+        entry = await build()
+        # 不存在的资源不缓存;构建期间发生失效时结果可能已过时,同样不缓存
+        if entry is not None and generation == self._generation:
+            self._set_local(key, entry)
+            await self._set_redis(key, entry)
+        return entry
+    
+    async def get_or_build(
+        self,
+        key: str,
+        build: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """获取缓存条目,未命中时调用build构建
+        
+        同一个键的并发未命中只执行一次build,其他请求等待同一结果。
+        build返回None表示资源不存在,结果不会被缓存。
+        """
+        entry = self._get_local(key)
+        if entry is not None:
+            self._hits += 1
+            return entry
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._build(key, build))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._coalesced += 1
+        return await asyncio.shield(task)
+    
+    async def invalidate_tags(self, tags: Iterable[str]):
+        """清除依赖任一标签的全部条目(开启Redis时同步到所有worker)"""
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        self._invalidations += 1
+        self._invalidate_local(tags)
+        if self._redis is None:
+            return
+        try:
+            tag_keys = [REDIS_TAG_PREFIX + tag for tag in tags]
+            keys = set()
+            for members in await asyncio.gather(*(self._redis.smembers(k) for k in tag_keys)):
+                keys.update(REDIS_KEY_PREFIX + member.decode() for member in members)
+            await self._redis.delete(*keys, *tag_keys)
+            await self._redis.publish(REDIS_INVALIDATE_CHANNEL, json.dumps(tags))
+        except Exception as e:
+            print(f"响应缓存失效通知发送失败: {e}")
+    
+    def metrics(self) -> Dict[str, Any]:
+        """缓存运行指标"""
+        return {
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self._hits,
+            "redis_hits": self._redis_hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations
+        }
+
+
+response_cache = ResponseCache(
+    ttl=settings.RESPONSE_CACHE_TTL,
+    maxsize=settings.RESPONSE_CACHE_MAXSIZE,
+    redis_url=settings.REDIS_URL if settings.RESPONSE_CACHE_USE_REDIS else None
+)
@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from sqlalchemy import select, update, func
+from ..config import settings
+from ..database import AsyncSessionLocal
+from .response_cache import response_cache, content_tag
+from .suggest import suggest_index, KIND_CONTENT, content_entry
+
+# 到期内容被其他副本锁定时,重试前等待的秒数
+RETRY_DELAY = 1.0
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class ScheduledPublisher:
+    """定时发布后台任务
+    
+    按下一条定时内容的scheduled_for休眠,到期才醒来,而不是固定间隔轮询;
+    最长休眠max_sleep秒,以发现其他副本写入的定时内容。
+    到期内容用FOR UPDATE SKIP LOCKED按批认领并发布,多个API副本同时运行也不会重复发布。
+    """
+    
+    def __init__(self, batch_size: int, max_sleep: float):
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._next_due: Optional[datetime] = None
+        self.published = 0
+        self.last_lag: Optional[float] = None
+        self.max_lag = 0.0
+        self.last_run: Optional[datetime] = None
+    
+    async def start(self):
+        """启动后台发布任务"""
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """停止后台发布任务"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def wake(self, due: Optional[datetime]):
+        """内容被设为定时发布后调用,早于当前计划的唤醒时间时提前唤醒"""
+        if due is None:
+            return
+        if self._next_due is None or _utc(due) < self._next_due:
+            self._wakeup.set()
+    
+    async def publish_batch(self) -> int:
+        """认领并发布一批到期内容,返回发布数量"""
+        from ..models.content import Content
+        
+        due = (
+            select(Content.id)
+            .where(Content.status == "scheduled", Content.scheduled_for <= func.now())
+            .order_by(Content.scheduled_for)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(Content)
+            .where(Content.id.in_(due), Content.status == "scheduled")
+            # published_at由content_publication_status_trigger设置为发布时刻
+            .values(status="published")
+            .returning(Content.id, Content.title, Content.slug, Content.content_type, Content.scheduled_for)
+            .execution_options(synchronize_session=False)
+        )
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(stmt)).all()
+            await db.commit()
+        if not rows:
+            return 0
+        
+        now = datetime.now(timezone.utc)
+        lag = max((now - _utc(row.scheduled_for)).total_seconds() for row in rows)
+        self.published += len(rows)
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        
+        await response_cache.invalidate_tags([content_tag(row.id) for row in rows])
+        for row in rows:
+            suggest_index.upsert(KIND_CONTENT, content_entry(
+                row.id, row.title, row.slug, row.content_type, "published"
+            ))
+        return len(rows)
+    
+    async def run_once(self) -> Optional[datetime]:
+        """发布全部到期内容,返回下一条定时内容的到期时间"""
+        from ..models.content import Content
+        
+        while await self.publish_batch() == self.batch_size:
+            pass
+        self.last_run = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            next_due = await db.scalar(
+                select(func.min(Content.scheduled_for)).where(Content.status == "scheduled")
+            )
+        return _utc(next_due) if next_due else None
+    
+    async def _run(self):
+        while True:
+            # 先清除再查询,查询期间的唤醒不会丢失
+            self._wakeup.clear()
+            timeout = self.max_sleep
+            try:
+                self._next_due = await self.run_once()
+                if self._next_due is not None:
+                    delay = (self._next_due - datetime.now(timezone.utc)).total_seconds()
+                    timeout = min(timeout, delay if delay > 0 else RETRY_DELAY)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"定时发布失败: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    
+    def metrics(self) -> Dict[str, Any]:
+        """发布数量和延迟(实际发布时间与scheduled_for之差,单位秒)"""
+        overdue = None
+        if self._next_due is not None:
+            overdue = max((datetime.now(timezone.utc) - self._next_due).total_seconds(), 0.0)
+        return {
+            "published": self.published,
+            "last_lag_seconds": self.last_lag,
+            "max_lag_seconds": self.max_lag,
+            "overdue_seconds": overdue,
+            "next_due": self._next_due.isoformat() if self._next_due else None,
+            "last_run": self.last_run.isoformat() if self.last_run else None
+        }
+
+
+scheduled_publisher = ScheduledPublisher(
+    batch_size=settings.SCHEDULED_PUBLISH_BATCH_SIZE,
+    max_sleep=settings.SCHEDULED_PUBLISH_MAX_SLEEP
+)
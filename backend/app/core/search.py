@@ -0,0 +1,163 @@
+import base64
+import json
+import re
+import uuid
+from functools import reduce
+from typing import Any, Iterable, List, Optional, Set, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import select, func, literal_column, tuple_, exists, cast, text, bindparam
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+
+# 高亮片段参数
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+# 搜索方式: 全文检索 / 标题三元组模糊匹配
+MODE_FULLTEXT = "fulltext"
+MODE_TRIGRAM = "trigram"
+
+
+def encode_search_cursor(mode: str, rank: float, id: uuid.UUID) -> str:
+    """把(搜索方式, 相关度, id)编码为不透明游标"""
+    raw = json.dumps([mode, rank, str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[str, float, uuid.UUID]:
+    """解码搜索游标,格式错误时返回400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        mode, rank, id = json.loads(raw)
+        if mode not in (MODE_FULLTEXT, MODE_TRIGRAM):
+            raise ValueError(mode)
+        return mode, float(rank), uuid.UUID(id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+
+def _config_literal(name: str):
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name):
+        raise ValueError(f"无效的文本搜索配置: {name}")
+    return literal_column(f"'{name}'")
+
+
+def search_query(q: str):
+    """把搜索词按SEARCH_CONFIGS中的每个配置解析后合并(OR)
+    
+    每行内容可以使用不同的文本搜索配置,合并后的查询对所有配置生成的向量都能命中,
+    且是与行无关的常量,可以使用search_vector上的GIN索引。
+    """
+    queries = [func.websearch_to_tsquery(_config_literal(name), q) for name in settings.SEARCH_CONFIGS]
+    return reduce(lambda a, b: a.op("||")(b), queries)
+
+
+async def ensure_search_config(db: AsyncSession, name: str):
+    """检查文本搜索配置是否存在,不存在时返回400"""
+    if not await db.scalar(text("SELECT 1 FROM pg_ts_config WHERE cfgname = :name"), {"name": name}):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的文本搜索配置: {name}"
+        )
+
+
+async def available_search_configs(db: AsyncSession, names: Iterable[str]) -> Set[str]:
+    """返回names中实际存在的文本搜索配置(一条查询)"""
+    names = sorted(set(names))
+    if not names:
+        return set()
+    rows = await db.scalars(
+        text("SELECT cfgname::text FROM pg_ts_config WHERE cfgname::text IN :names")
+        .bindparams(bindparam("names", expanding=True)),
+        {"names": names}
+    )
+    return set(rows.all())
+
+
+async def search_content(
+    db: AsyncSession,
+    q: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    content_type: Optional[str] = None,
+    status: Optional[str] = None,
+    term_id: Optional[uuid.UUID] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """搜索内容,返回(结果行, 下一页游标)
+    
+    优先使用search_vector全文检索,按ts_rank_cd排序(标题和关键词权重最高);
+    第一页没有结果时改用标题三元组相似度,以容忍拼写错误。两种方式都按(相关度, id)键集分页,游标中记录搜索方式。
+    先在子查询中取出当前页的id和相关度,只对这一页生成高亮片段。
+    """
+    from ..models.content import Content, ContentTerm
+    
+    filters = []
+    if content_type:
+        filters.append(Content.content_type == content_type)
+    if status:
+        filters.append(Content.status == status)
+    if term_id:
+        filters.append(exists().where(
+            ContentTerm.content_id == Content.id,
+            ContentTerm.term_id == term_id
+        ))
+    
+    after = None
+    mode = MODE_FULLTEXT
+    if cursor:
+        mode, *after = decode_search_cursor(cursor)
+    
+    tsquery = search_query(q)
+    
+    async def run(mode: str):
+        if mode == MODE_FULLTEXT:
+            rank = func.ts_rank_cd(Content.search_vector, tsquery)
+            match = Content.search_vector.op("@@")(tsquery)
+        else:
+            rank = func.similarity(Content.title, q)
+            match = Content.title.op("%")(q)
+        
+        page = select(Content.id, rank.label("rank")).where(match, *filters)
+        if after:
+            page = page.where(tuple_(rank, Content.id) < tuple_(*after))
+        page = page.order_by(rank.desc(), Content.id.desc()).limit(limit + 1).subquery()
+        
+        snippet_source = func.coalesce(func.nullif(Content.excerpt, ""), Content.content)
+        query = (
+            select(
+                Content.id,
+                Content.title,
+                Content.slug,
+                Content.content_type,
+                Content.status,
+                Content.excerpt,
+                Content.published_at,
+                Content.created_at,
+                page.c.rank,
+                func.ts_headline(
+                    cast(Content.search_config, REGCONFIG),
+                    snippet_source,
+                    tsquery,
+                    HEADLINE_OPTIONS
+                ).label("headline")
+            )
+            .join(page, page.c.id == Content.id)
+            .order_by(page.c.rank.desc(), Content.id.desc())
+        )
+        return (await db.execute(query)).all()
+    
+    rows = await run(mode)
+    if not rows and not cursor:
+        mode = MODE_TRIGRAM
+        rows = await run(mode)
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_search_cursor(mode, last.rank, last.id)
+    
+    return [{**row._mapping, "match": mode} for row in rows], next_cursor
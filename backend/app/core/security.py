@@ -1,12 +1,15 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..config import settings
-from ..database import get_db
+from ..database import get_async_db
+from ..schemas.user import UserPrincipal
+from .auth_cache import principal_cache, load_principal
 
 # 密码加密上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -62,11 +65,9 @@ def decode_token(token: str) -> dict:
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    """获取当前用户"""
-    from ..models.user import User
-    
+    db: AsyncSession = Depends(get_async_db)
+) -> UserPrincipal:
+    """获取当前用户(优先从进程内缓存读取)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无法验证凭据",
@@ -80,10 +81,19 @@ async def get_current_user(
     if user_id is None or token_type != "access":
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    try:
+        user_id = uuid.UUID(user_id)
+    except ValueError:
         raise credentials_exception
     
+    user = principal_cache.get(user_id)
+    if user is None:
+        version = principal_cache.version
+        user = await load_principal(db, user_id)
+        if user is None:
+            raise credentials_exception
+        principal_cache.set(user, version)
+    
     if not user.is_active:
         raise HTTPException(status_code=400, detail="账户已被禁用")
     
@@ -91,7 +101,47 @@ async def get_current_user(
 
 
 async def get_current_active_user(
-    current_user = Depends(get_current_user)
-):
+    current_user: UserPrincipal = Depends(get_current_user)
+) -> UserPrincipal:
     """获取当前激活用户"""
     return current_user
+
+
+# 操作名别名,映射到初始化数据中使用的操作名
+PERMISSION_ACTION_ALIASES = {
+    "edit": "update",
+    "view": "read",
+    "remove": "delete"
+}
+
+
+def normalize_permission(name: str) -> str:
+    """权限名统一为初始化数据中的 资源.操作 格式
+    
+    也接受 资源:操作,操作名按PERMISSION_ACTION_ALIASES映射,例如 content:edit -> content.update。
+    """
+    resource, _, action = name.replace(":", ".").rpartition(".")
+    action = PERMISSION_ACTION_ALIASES.get(action, action)
+    return f"{resource}.{action}" if resource else action
+
+
+def has_permission(user: UserPrincipal, permission: str) -> bool:
+    """检查用户是否拥有权限(集合查找,不访问数据库)"""
+    return normalize_permission(permission) in user.permissions
+
+
+def require_permission(permission: str):
+    """要求当前用户拥有指定权限的依赖,例如 Depends(require_permission("content.update"))"""
+    permission = normalize_permission(permission)
+    
+    async def dependency(
+        current_user: UserPrincipal = Depends(get_current_active_user)
+    ) -> UserPrincipal:
+        if permission not in current_user.permissions:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"缺少权限: {permission}"
+            )
+        return current_user
+    
+    return dependency
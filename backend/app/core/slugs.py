@@ -0,0 +1,111 @@
+import re
+from typing import Dict, Iterable, List, Set
+from fastapi import HTTPException, status
+from slugify import slugify
+from sqlalchemy import select, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 为数字后缀预留的长度
+SUFFIX_RESERVE = 10
+# 内容slug列的最大长度为200
+MAX_BASE_LENGTH = 200 - SUFFIX_RESERVE
+# 并发写入抢占slug时的重试次数
+SLUG_ATTEMPTS = 3
+# PostgreSQL唯一约束冲突的错误码
+UNIQUE_VIOLATION = "23505"
+
+
+def base_slug(value: str, max_length: int = MAX_BASE_LENGTH) -> str:
+    """根据标题或用户输入生成基础slug"""
+    return slugify(value)[:max_length].rstrip("-") or "item"
+
+
+def base_length(column) -> int:
+    """slug列可用于基础slug的长度"""
+    return (column.type.length or MAX_BASE_LENGTH + SUFFIX_RESERVE) - SUFFIX_RESERVE
+
+
+def is_unique_violation(error: IntegrityError, column) -> bool:
+    """是否为该列上的唯一约束冲突"""
+    code = getattr(error.orig, "sqlstate", None) or getattr(error.orig, "pgcode", None)
+    return code == UNIQUE_VIOLATION and column.key in str(error.orig)
+
+
+def _suffix_pattern(bases: Iterable[str]) -> str:
+    return "^(" + "|".join(re.escape(base) for base in bases) + ")-([0-9]+)$"
+
+
+async def taken_slugs(db: AsyncSession, column, bases: Iterable[str], *scope) -> Set[str]:
+    """一条查询取出与这些基础slug相同或形如 base-数字 的已有slug
+    
+    scope为额外的过滤条件,用于slug只在部分范围内唯一(如同一分类法下的术语)或排除当前记录。
+    """
+    bases = sorted(set(bases))
+    if not bases:
+        return set()
+    rows = await db.scalars(
+        select(column).where(or_(column.in_(bases), column.op("~")(_suffix_pattern(bases))), *scope)
+    )
+    return set(rows.all())
+
+
+def assign_slugs(bases: List[str], taken: Set[str]) -> List[str]:
+    """按顺序为每个基础slug分配不冲突的slug,已占用时使用最大数字后缀加一
+    
+    taken会被更新,同一批中重复的基础slug也不会互相冲突。
+    """
+    pattern = re.compile(_suffix_pattern(set(bases))) if bases else None
+    next_suffix: Dict[str, int] = {}
+    for slug in taken:
+        match = pattern.match(slug) if pattern else None
+        if match:
+            base, number = match.group(1), int(match.group(2))
+            next_suffix[base] = max(next_suffix.get(base, 1), number + 1)
+    
+    slugs = []
+    for base in bases:
+        slug = base
+        while slug in taken:
+            number = next_suffix.get(base, 1)
+            next_suffix[base] = number + 1
+            slug = f"{base}-{number}"
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+async def allocate_slugs(db: AsyncSession, column, bases: List[str], *scope) -> List[str]:
+    """为一批基础slug分配唯一slug(无论批次多大只查询一次)"""
+    return assign_slugs(bases, await taken_slugs(db, column, bases, *scope))
+
+
+async def flush_with_slug(db: AsyncSession, instance, value: str, *scope, exact: bool = False) -> str:
+    """为新建或修改的记录分配slug并写入(flush),返回最终的slug
+    
+    不预先检查可用性,而是在SAVEPOINT中直接写入,遇到唯一约束冲突(并发写入抢先)时重新分配并重试。
+    value为标题或期望的slug;exact=True表示必须使用value本身,冲突时返回400。
+    适用于任何带slug列的模型(Content、Taxonomy、Term、Menu),scope见taken_slugs。
+    """
+    column = type(instance).slug
+    base = value if exact else base_slug(value, base_length(column))
+    for _ in range(SLUG_ATTEMPTS):
+        slug = base if exact else (await allocate_slugs(db, column, [base], *scope))[0]
+        try:
+            async with db.begin_nested():
+                instance.slug = slug
+                db.add(instance)
+                await db.flush()
+            return slug
+        except IntegrityError as e:
+            if not is_unique_violation(e, column):
+                raise
+            if exact:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="该slug已存在"
+                )
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="slug分配冲突,请重试"
+    )
@@ -0,0 +1,131 @@
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.stats import DailyContentStats, DailySiteStats
+
+
+def utc_today() -> date:
+    """当前UTC日期(统计表按UTC日期分桶)"""
+    return datetime.utcnow().date()
+
+
+async def add_daily_views(db: AsyncSession, counts: Dict[uuid.UUID, int], day: Optional[date] = None):
+    """把一批浏览增量累加到内容每日统计"""
+    if not counts:
+        return
+    day = day or utc_today()
+    
+    stmt = insert(DailyContentStats).values([
+        {"day": day, "content_id": content_id, "views": n}
+        for content_id, n in counts.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyContentStats.day, DailyContentStats.content_id],
+        set_={"views": DailyContentStats.views + stmt.excluded.views}
+    )
+    await db.execute(stmt)
+
+
+async def add_daily_comments(db: AsyncSession, counts: Dict[uuid.UUID, int], day: Optional[date] = None):
+    """把一批已审核评论数累加到内容每日统计"""
+    if not counts:
+        return
+    day = day or utc_today()
+    
+    stmt = insert(DailyContentStats).values([
+        {"day": day, "content_id": content_id, "comments": n}
+        for content_id, n in counts.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyContentStats.day, DailyContentStats.content_id],
+        set_={"comments": DailyContentStats.comments + stmt.excluded.comments}
+    )
+    await db.execute(stmt)
+
+
+async def compact_daily_stats(db: AsyncSession, lookback_days: int, retention_days: int):
+    """把最近几天的内容统计汇总到全站每日统计,并清理过期的内容统计
+    
+    汇总是幂等的:每次重新计算回溯窗口内每天的合计并覆盖写入。
+    """
+    since = utc_today() - timedelta(days=lookback_days)
+    
+    totals = select(
+        DailyContentStats.day,
+        func.sum(DailyContentStats.views),
+        func.sum(DailyContentStats.likes),
+        func.sum(DailyContentStats.comments)
+    ).where(
+        DailyContentStats.day >= since
+    ).group_by(DailyContentStats.day)
+    
+    stmt = insert(DailySiteStats).from_select(["day", "views", "likes", "comments"], totals)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailySiteStats.day],
+        set_={
+            "views": stmt.excluded.views,
+            "likes": stmt.excluded.likes,
+            "comments": stmt.excluded.comments,
+            "updated_at": func.now()
+        }
+    )
+    await db.execute(stmt)
+    
+    # 超过保留期的内容统计已经汇总过,可以删除
+    if retention_days > lookback_days:
+        await db.execute(
+            delete(DailyContentStats).where(
+                DailyContentStats.day < utc_today() - timedelta(days=retention_days)
+            )
+        )
+
+
+class StatsCompactor:
+    """定期执行每日统计压缩的后台任务"""
+    
+    def __init__(self, interval: float, lookback_days: int, retention_days: int):
+        self.interval = interval
+        self.lookback_days = lookback_days
+        self.retention_days = retention_days
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """启动后台压缩任务"""
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """停止后台压缩任务"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def run_once(self):
+        """执行一次压缩"""
+        async with AsyncSessionLocal() as db:
+            await compact_daily_stats(db, self.lookback_days, self.retention_days)
+            await db.commit()
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"每日统计压缩失败: {e}")
+            await asyncio.sleep(self.interval)
+
+
+stats_compactor = StatsCompactor(
+    interval=settings.STATS_COMPACT_INTERVAL,
+    lookback_days=settings.STATS_COMPACT_LOOKBACK_DAYS,
+    retention_days=settings.STATS_CONTENT_RETENTION_DAYS
+)
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional, Tuple
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+
+# 内容寻址存储的子目录
+BLOB_DIR = "blobs"
+
+
+def _open_temp(dest_dir: str):
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-")
+    return os.fdopen(fd, "wb"), temp_path
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _move(src: str, dest: str):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    os.replace(src, dest)
+
+
+def upload_url(file_path: str) -> str:
+    """根据上传目录下的文件路径生成访问URL"""
+    relpath = os.path.relpath(file_path, settings.UPLOAD_DIR).replace(os.sep, "/")
+    return f"/uploads/{relpath}"
+
+
+def blob_path(sha256: str, ext: str) -> str:
+    """内容寻址文件路径: UPLOAD_DIR/blobs/ab/cd/<sha256><ext>"""
+    return os.path.join(settings.UPLOAD_DIR, BLOB_DIR, sha256[:2], sha256[2:4], f"{sha256}{ext.lower()}")
+
+
+async def stream_to_temp(
+    file: UploadFile,
+    dest_dir: str,
+    max_size: int = settings.MAX_UPLOAD_SIZE,
+    chunk_size: int = settings.UPLOAD_CHUNK_SIZE
+) -> Tuple[str, int, str]:
+    """分块把上传文件写入dest_dir下的临时文件
+    
+    按固定大小分块读取,在线程池中写入,边读边累计大小和SHA-256,超过大小限制立即中止。
+    返回(临时文件路径, 文件大小, SHA-256十六进制摘要)。
+    """
+    buffer, temp_path = await run_in_threadpool(_open_temp, dest_dir)
+    digest = hashlib.sha256()
+    size = 0
+    
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"文件大小超过限制({max_size} bytes)"
+                )
+            digest.update(chunk)
+            await run_in_threadpool(buffer.write, chunk)
+        await run_in_threadpool(buffer.close)
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(_remove_quietly, temp_path)
+        raise
+    
+    return temp_path, size, digest.hexdigest()
+
+
+async def save_upload(file: UploadFile, dest_path: str) -> Tuple[int, str]:
+    """分块保存上传文件,写完后原子重命名到目标路径
+    
+    返回(文件大小, SHA-256十六进制摘要)。
+    """
+    temp_path, size, sha256 = await stream_to_temp(file, os.path.dirname(dest_path))
+    try:
+        await run_in_threadpool(os.replace, temp_path, dest_path)
+    except OSError:
+        await run_in_threadpool(_remove_quietly, temp_path)
+        raise
+    return size, sha256
+
+
+async def lock_blob(db: AsyncSession, key: str):
+    """对同一个文件的复用和删除加事务级咨询锁,避免并发上传与删除互相覆盖"""
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(key))))
+
+
+async def save_content_addressed(
+    db: AsyncSession,
+    file: UploadFile,
+    ext: str
+) -> Tuple[str, int, str, bool]:
+    """按内容哈希保存上传文件,相同内容只保存一份
+    
+    返回(文件路径, 文件大小, SHA-256, 是否复用了已有文件)。
+    调用方需要在同一事务中写入Media记录,咨询锁在提交时释放。
+    """
+    from ..models.media import Media
+    
+    temp_dir = os.path.join(settings.UPLOAD_DIR, BLOB_DIR)
+    temp_path, size, sha256 = await stream_to_temp(file, temp_dir)
+    
+    try:
+        await lock_blob(db, sha256)
+        existing_path: Optional[str] = await db.scalar(
+            select(Media.file_path).where(Media.content_hash == sha256).limit(1)
+        )
+        if existing_path and await run_in_threadpool(os.path.exists, existing_path):
+            await run_in_threadpool(_remove_quietly, temp_path)
+            return existing_path, size, sha256, True
+        
+        file_path = blob_path(sha256, ext)
+        await run_in_threadpool(_move, temp_path, file_path)
+        return file_path, size, sha256, False
+    except BaseException:
+        await run_in_threadpool(_remove_quietly, temp_path)
+        raise
+
+
+async def release_file(db: AsyncSession, media) -> bool:
+    """删除媒体记录前调用:没有其他记录引用同一文件时删除文件
+    
+    返回文件是否被删除。
+    """
+    from ..models.media import Media
+    
+    await lock_blob(db, media.content_hash or media.file_path)
+    references = await db.scalar(
+        select(func.count()).select_from(Media).where(
+            Media.file_path == media.file_path,
+            Media.id != media.id
+        )
+    )
+    if references:
+        return False
+    
+    await run_in_threadpool(_remove_quietly, media.file_path)
+    return True
@@ -0,0 +1,239 @@
+import asyncio
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from ..config import settings
+from ..database import AsyncSessionLocal
+
+# 建议类型
+KIND_CONTENT = "content"
+KIND_TERM = "term"
+KIND_USER = "user"
+KINDS = (KIND_CONTENT, KIND_TERM, KIND_USER)
+
+# 每个条目最多按多少个词的起始位置建立前缀
+MAX_WORD_KEYS = 6
+# 索引键的最大长度,过长的标题只保留前缀部分
+MAX_KEY_LENGTH = 64
+
+
+def normalize(value: str) -> str:
+    """统一全半角和大小写,便于前缀匹配"""
+    return unicodedata.normalize("NFKC", value).casefold().strip()
+
+
+def index_keys(label: str) -> List[str]:
+    """条目的索引键:完整标签以及各个词开头的后缀,使输入任意一个词的前缀都能命中"""
+    text = normalize(label)
+    words = text.split()
+    keys = []
+    position = 0
+    for word in words[:MAX_WORD_KEYS]:
+        position = text.index(word, position)
+        keys.append(text[position:position + MAX_KEY_LENGTH])
+        position += len(word)
+    return keys or [text[:MAX_KEY_LENGTH]]
+
+
+class PrefixTable:
+    """有序数组加二分查找的前缀表
+    
+    keys中保存(索引键, id)并保持有序,查询时二分定位到第一个不小于前缀的位置后顺序扫描。
+    条目为(id, 索引文本, 返回给客户端的数据)。
+    """
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.keys: List[Tuple[str, str]] = []
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.texts: Dict[str, str] = {}
+    
+    @classmethod
+    def build(cls, maxsize: int, entries: Iterable[Tuple[str, str, Dict[str, Any]]]) -> "PrefixTable":
+        """批量构建(排序一次,比逐条插入快得多)"""
+        table = cls(maxsize)
+        for id, text, item in entries:
+            if len(table.items) >= maxsize:
+                break
+            table.items[id] = item
+            table.texts[id] = text
+            table.keys.extend((key, id) for key in index_keys(text))
+        table.keys.sort()
+        return table
+    
+    def remove(self, id: str):
+        text = self.texts.pop(id, None)
+        if text is None:
+            return
+        del self.items[id]
+        for key in index_keys(text):
+            position = bisect_left(self.keys, (key, id))
+            if position < len(self.keys) and self.keys[position] == (key, id):
+                del self.keys[position]
+    
+    def upsert(self, id: str, text: str, item: Dict[str, Any]):
+        self.remove(id)
+        # 达到容量上限时不再收录新条目,等待下次全量对账
+        if len(self.items) >= self.maxsize:
+            return
+        self.items[id] = item
+        self.texts[id] = text
+        for key in index_keys(text):
+            insort(self.keys, (key, id))
+    
+    def search(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        results = []
+        seen = set()
+        position = bisect_left(self.keys, (prefix,))
+        while position < len(self.keys) and len(results) < limit:
+            key, id = self.keys[position]
+            if not key.startswith(prefix):
+                break
+            if id not in seen:
+                seen.add(id)
+                results.append(self.items[id])
+            position += 1
+        return results
+
+
+class SuggestIndex:
+    """内容标题、术语名称和用户显示名的输入建议索引
+    
+    索引常驻内存,写接口调用upsert/remove增量更新,后台任务定期从数据库全量重建以对账。
+    每种类型最多收录maxsize个条目(优先最近更新的内容和用户)。
+    """
+    
+    def __init__(self, maxsize: int, reconcile_interval: float):
+        self.maxsize = maxsize
+        self.reconcile_interval = reconcile_interval
+        self._tables: Dict[str, PrefixTable] = {kind: PrefixTable(maxsize) for kind in KINDS}
+        # 全量重建期间发生的增量更新,重建完成后重放
+        self._journal: Optional[List[Tuple]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+    
+    async def start(self):
+        """启动后台任务(首次构建和定期对账)"""
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """停止后台任务"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.rebuild()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"输入建议索引重建失败: {e}")
+            await asyncio.sleep(self.reconcile_interval)
+    
+    async def _load(self, db) -> Dict[str, List[Tuple[str, str, Dict[str, Any]]]]:
+        from ..models.content import Content, Term
+        from ..models.user import User
+        
+        contents = (await db.execute(
+            select(Content.id, Content.title, Content.slug, Content.content_type, Content.status)
+            .order_by(Content.updated_at.desc())
+            .limit(self.maxsize)
+        )).all()
+        terms = (await db.execute(
+            select(Term.id, Term.name, Term.slug, Term.taxonomy_id)
+            .order_by(Term.name)
+            .limit(self.maxsize)
+        )).all()
+        users = (await db.execute(
+            select(User.id, User.display_name, User.username)
+            .where(User.is_active == True)
+            .order_by(User.updated_at.desc())
+            .limit(self.maxsize)
+        )).all()
+        
+        return {
+            KIND_CONTENT: [content_entry(*row) for row in contents],
+            KIND_TERM: [term_entry(*row) for row in terms],
+            KIND_USER: [user_entry(*row) for row in users],
+        }
+    
+    async def rebuild(self):
+        """从数据库全量重建索引"""
+        self._journal = []
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = await self._load(db)
+            tables = {
+                kind: await asyncio.to_thread(PrefixTable.build, self.maxsize, rows[kind])
+                for kind in KINDS
+            }
+            journal, self._journal = self._journal, None
+            for op, kind, arg in journal:
+                if op == "upsert":
+                    tables[kind].upsert(*arg)
+                else:
+                    tables[kind].remove(str(arg))
+            self._tables = tables
+            self.ready = True
+        finally:
+            self._journal = None
+    
+    def upsert(self, kind: str, entry: Tuple[str, str, Dict[str, Any]]):
+        """新增或更新一个条目"""
+        if self._journal is not None:
+            self._journal.append(("upsert", kind, entry))
+        self._tables[kind].upsert(*entry)
+    
+    def remove(self, kind: str, id):
+        """删除一个条目"""
+        if self._journal is not None:
+            self._journal.append(("remove", kind, id))
+        self._tables[kind].remove(str(id))
+    
+    def search(self, q: str, kinds: Iterable[str] = KINDS, limit: int = 10) -> List[Dict[str, Any]]:
+        """按前缀查找建议,结果按类型分组排列"""
+        prefix = normalize(q)
+        if not prefix:
+            return []
+        results = []
+        for kind in kinds:
+            for item in self._tables[kind].search(prefix, limit):
+                results.append({"type": kind, **item})
+        return results
+    
+    def metrics(self) -> Dict[str, Any]:
+        """索引规模"""
+        return {
+            "ready": self.ready,
+            **{kind: len(table.items) for kind, table in self._tables.items()},
+            "keys": sum(len(table.keys) for table in self._tables.values())
+        }
+
+
+def content_entry(id, title, slug, content_type, status) -> Tuple[str, str, Dict[str, Any]]:
+    item = {"id": str(id), "label": title, "slug": slug, "content_type": content_type, "status": status}
+    return str(id), title, item
+
+
+def term_entry(id, name, slug, taxonomy_id) -> Tuple[str, str, Dict[str, Any]]:
+    item = {"id": str(id), "label": name, "slug": slug, "taxonomy_id": str(taxonomy_id)}
+    return str(id), name, item
+
+
+def user_entry(id, display_name, username) -> Tuple[str, str, Dict[str, Any]]:
+    # 显示名和用户名都可以匹配
+    item = {"id": str(id), "label": display_name or username, "username": username}
+    return str(id), f"{display_name or ''} {username}", item
+
+
+suggest_index = SuggestIndex(
+    maxsize=settings.SUGGEST_MAX_ENTRIES,
+    reconcile_interval=settings.SUGGEST_RECONCILE_INTERVAL
+)
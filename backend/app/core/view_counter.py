@@ -0,0 +1,161 @@
+import asyncio
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional, Set
+from sqlalchemy import update, values, column, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from ..config import settings
+from ..database import AsyncSessionLocal
+
+# Redis中待刷新的浏览计数哈希键
+REDIS_PENDING_KEY = "cms:views:pending"
+
+
+class ViewCounter:
+    """浏览计数缓冲器
+    
+    读请求只在内存(或Redis)中累加计数,由后台任务按批次合并写入数据库,
+    避免每次读取都产生一次行锁和写事务。
+    """
+    
+    def __init__(self, flush_interval: float, max_buffer: int, redis_url: Optional[str] = None):
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.redis_url = redis_url
+        self._buffer: Dict[uuid.UUID, int] = defaultdict(int)
+        self._pending = 0
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+    
+    async def start(self):
+        """启动后台刷新任务"""
+        if self.redis_url:
+            try:
+                from redis import asyncio as aioredis
+                self._redis = aioredis.from_url(self.redis_url)
+                await self._redis.ping()
+            except Exception as e:
+                print(f"浏览计数Redis不可用,使用进程内缓冲: {e}")
+                self._redis = None
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """停止后台任务并刷新剩余计数"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            # 关闭阶段不再抛出,计数已放回缓冲区(Redis模式下由其他worker继续刷新)
+            print(f"浏览计数最终刷新失败: {e}")
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+    
+    async def incr(self, content_id: uuid.UUID, n: int = 1):
+        """记录一次浏览(不访问数据库)"""
+        if self._redis is not None:
+            await self._redis.hincrby(REDIS_PENDING_KEY, str(content_id), n)
+        else:
+            self._buffer[content_id] += n
+        self._pending += 1
+        if self._pending >= self.max_buffer:
+            self._wakeup.set()
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"浏览计数刷新失败: {e}")
+    
+    async def _take(self) -> Dict[uuid.UUID, int]:
+        """取出当前缓冲区的全部计数"""
+        self._pending = 0
+        if self._redis is None:
+            counts, self._buffer = self._buffer, defaultdict(int)
+            return counts
+        
+        # 先改名再读取,保证多个worker之间不会重复刷新同一批计数
+        flushing_key = f"{REDIS_PENDING_KEY}:{uuid.uuid4()}"
+        try:
+            await self._redis.rename(REDIS_PENDING_KEY, flushing_key)
+        except Exception:
+            return {}
+        raw = await self._redis.hgetall(flushing_key)
+        await self._redis.delete(flushing_key)
+        return {uuid.UUID(k.decode()): int(v) for k, v in raw.items()}
+    
+    async def _restore(self, counts: Dict[uuid.UUID, int]):
+        """刷新失败时把计数放回缓冲区"""
+        for content_id, n in counts.items():
+            if self._redis is not None:
+                await self._redis.hincrby(REDIS_PENDING_KEY, str(content_id), n)
+            else:
+                self._buffer[content_id] += n
+    
+    async def flush(self):
+        """把缓冲的计数用一条 UPDATE ... FROM (VALUES ...) 写入数据库,同时累加每日统计
+        
+        缓冲期间被删除的内容不会出现在UPDATE的返回结果中,它们的计数直接丢弃,
+        否则每日统计的外键约束会让这一批(以及之后每一批)刷新都失败。
+        """
+        from .stats_rollup import add_daily_views, utc_today
+        
+        day = utc_today()
+        counts = await self._take()
+        if not counts:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                existing = await apply_view_counts(db, counts)
+                await add_daily_views(
+                    db,
+                    {content_id: n for content_id, n in counts.items() if content_id in existing},
+                    day
+                )
+                await db.commit()
+        except Exception:
+            await self._restore(counts)
+            raise
+
+
+async def apply_view_counts(db, counts: Dict[uuid.UUID, int]) -> Set[uuid.UUID]:
+    """在给定会话中批量累加浏览次数,返回仍然存在的内容id
+    
+    UPDATE锁住了这些内容行,同一事务内随后写入每日统计时它们不会被并发删除。
+    """
+    from ..models.content import Content
+    
+    batch = values(
+        column("id", UUID(as_uuid=True)),
+        column("n", Integer),
+        name="v"
+    ).data(list(counts.items()))
+    
+    result = await db.execute(
+        update(Content)
+        .where(Content.id == batch.c.id)
+        .values(view_count=Content.view_count + batch.c.n)
+        .returning(Content.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(result.scalars().all())
+
+
+view_counter = ViewCounter(
+    flush_interval=settings.VIEW_COUNT_FLUSH_INTERVAL,
+    max_buffer=settings.VIEW_COUNT_MAX_BUFFER,
+    redis_url=settings.REDIS_URL if settings.VIEW_COUNT_USE_REDIS else None
+)
@@ -1,9 +1,22 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
 from .config import settings
-from .api.v1 import auth, users, content, media, modules, stats
+from .api.v1 import auth, users, content, media, modules, stats, suggest, comments, options, menus
+from .core.view_counter import view_counter
+from .core.stats_rollup import stats_compactor
+from .core.pagination import NEXT_CURSOR_HEADER
+from .core.auth_cache import principal_cache
+from .core.password_hasher import password_hasher
+from .core.images import shutdown_pool as shutdown_image_pool
+from .core.image_transform import ImageStaticFiles, derivative_cache
+from .core.response_cache import response_cache
+from .core.suggest import suggest_index
+from .core.scheduled_publisher import scheduled_publisher
+from .core.comment_queue import comment_ingestor
+from .core.options import options_service
+from .core.menus import menu_cache_invalidator
+from .core.security import require_permission
 import os
 import time
 
@@ -21,6 +34,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # 请求日志中间件
@@ -49,16 +63,20 @@ api_v1_prefix = "/api/v1"
 app.include_router(auth.router, prefix=f"{api_v1_prefix}/auth", tags=["认证"])
 app.include_router(users.router, prefix=f"{api_v1_prefix}/users", tags=["用户"])
 app.include_router(content.router, prefix=f"{api_v1_prefix}/content", tags=["内容"])
+app.include_router(comments.router, prefix=f"{api_v1_prefix}/comments", tags=["评论"])
 app.include_router(media.router, prefix=f"{api_v1_prefix}/media", tags=["媒体"])
 app.include_router(modules.router, prefix=f"{api_v1_prefix}/modules", tags=["模块"])
+app.include_router(menus.router, prefix=f"{api_v1_prefix}/menus", tags=["菜单"])
+app.include_router(options.router, prefix=f"{api_v1_prefix}/options", tags=["选项"])
 app.include_router(stats.router, prefix=f"{api_v1_prefix}/stats", tags=["统计"])
+app.include_router(suggest.router, prefix=f"{api_v1_prefix}/suggest", tags=["输入建议"])
 
-# 静态文件服务
+# 静态文件服务(图片支持 ?w=&fmt= 按需缩放)
 if os.path.exists(settings.UPLOAD_DIR):
-    app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+    app.mount("/uploads", ImageStaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 else:
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+    app.mount("/uploads", ImageStaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 # 根路径
 @app.get("/")
@@ -79,14 +97,47 @@ async def health_check():
         "timestamp": time.time()
     }
 
+# 运行指标(暴露各服务的内部状态,只对有系统设置权限的用户开放)
+@app.get("/metrics", dependencies=[Depends(require_permission("settings.manage"))])
+async def metrics():
+    return {
+        "password_hashing": password_hasher.metrics(),
+        "image_cache": derivative_cache.metrics(),
+        "response_cache": response_cache.metrics(),
+        "suggest_index": suggest_index.metrics(),
+        "scheduled_publishing": scheduled_publisher.metrics(),
+        "comment_queue": comment_ingestor.metrics(),
+        "options": options_service.metrics()
+    }
+
 # 启动事件
 @app.on_event("startup")
 async def startup_event():
     print(f"启动 {settings.APP_NAME} v{settings.APP_VERSION}")
     print(f"调试模式: {settings.DEBUG}")
     print(f"API文档: http://localhost:8000/docs")
+    await view_counter.start()
+    await stats_compactor.start()
+    await principal_cache.start()
+    await options_service.start()
+    await response_cache.start()
+    await menu_cache_invalidator.start()
+    await suggest_index.start()
+    await scheduled_publisher.start()
+    await comment_ingestor.start()
 
 # 关闭事件
 @app.on_event("shutdown")
 async def shutdown_event():
+    await comment_ingestor.stop()
+    await scheduled_publisher.stop()
+    await suggest_index.stop()
+    await menu_cache_invalidator.stop()
+    await response_cache.stop()
+    await options_service.stop()
+    await principal_cache.stop()
+    password_hasher.shutdown()
+    shutdown_image_pool()
+    await stats_compactor.stop()
+    await view_counter.stop()
     print(f"关闭 {settings.APP_NAME}")
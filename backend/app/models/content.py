@@ -1,6 +1,7 @@
 import uuid
 from sqlalchemy import Column, String, Text, Integer, TIMESTAMP, Boolean, ForeignKey, ARRAY
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from ..database import Base
 
@@ -32,6 +33,10 @@ class Content(Base):
     meta_description = Column(String(160))
     meta_keywords = Column(ARRAY(Text))
     
+    # 全文检索(search_vector由数据库触发器维护,默认不加载)
+    search_config = Column(String(64), nullable=False, server_default='simple')
+    search_vector = deferred(Column(TSVECTOR))
+    
     # 发布信息
     published_at = Column(TIMESTAMP(timezone=True), index=True)
     scheduled_for = Column(TIMESTAMP(timezone=True))
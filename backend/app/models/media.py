@@ -19,6 +19,7 @@ class Media(Base):
     width = Column(Integer)
     height = Column(Integer)
     duration = Column(Integer)
+    content_hash = Column(String(64), index=True)
     
     # 媒体元数据
     alt_text = Column(Text)
@@ -37,6 +38,12 @@ class Media(Base):
     
     # 扩展数据
     meta_data = Column("metadata", JSONB, default={})
+    
+    @property
+    def variants(self):
+        """衍生图片列表(含尚未生成的尺寸)"""
+        from ..core.images import list_variants
+        return list_variants(self)
 
 
 class MediaMetadata(Base):
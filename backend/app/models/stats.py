@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, BigInteger, Date, TIMESTAMP
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class DailyContentStats(Base):
+    """内容每日统计模型"""
+    __tablename__ = "daily_content_stats"
+    
+    day = Column(Date, primary_key=True)
+    content_id = Column(UUID(as_uuid=True), primary_key=True, index=True)
+    views = Column(Integer, nullable=False, default=0)
+    likes = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+
+
+class DailySiteStats(Base):
+    """全站每日统计模型"""
+    __tablename__ = "daily_site_stats"
+    
+    day = Column(Date, primary_key=True)
+    views = Column(BigInteger, nullable=False, default=0)
+    likes = Column(BigInteger, nullable=False, default=0)
+    comments = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,52 @@
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Literal
+from datetime import datetime
+import uuid
+
+
+# 评论创建
+class CommentCreate(BaseModel):
+    content_id: uuid.UUID
+    parent_id: Optional[uuid.UUID] = None
+    author_name: str = Field(..., min_length=1, max_length=100)
+    author_email: EmailStr
+    author_url: Optional[str] = None
+    content: str = Field(..., min_length=1)
+
+
+# 评论状态更新(审核)
+class CommentStatusUpdate(BaseModel):
+    status: Literal["pending", "approved", "spam", "trash"]
+
+
+# 评论提交结果(id即写入后的评论id;status为queued表示仍在队列中)
+class CommentSubmissionResponse(BaseModel):
+    id: uuid.UUID
+    status: str
+
+
+# 评论响应(不包含邮箱和IP)
+class CommentResponse(BaseModel):
+    id: uuid.UUID
+    content_id: uuid.UUID
+    parent_id: Optional[uuid.UUID]
+    author_name: str
+    author_url: Optional[str]
+    content: str
+    content_format: str
+    status: str
+    is_pinned: bool
+    like_count: int
+    reply_count: int
+    created_at: datetime
+    depth: int = 0
+    
+    class Config:
+        from_attributes = True
+
+
+# 评论线程(顶层评论及按树的先序排列的回复)
+class CommentThread(CommentResponse):
+    replies: List[CommentResponse] = []
+    reply_total: int = 0
+    replies_cursor: Optional[str] = None
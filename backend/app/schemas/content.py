@@ -19,6 +19,7 @@ class ContentCreate(BaseModel):
     meta_title: Optional[str] = None
     meta_description: Optional[str] = None
     meta_keywords: Optional[List[str]] = []
+    search_config: Optional[str] = Field(default=None, max_length=64)
     scheduled_for: Optional[datetime] = None
     meta_data: Dict[str, Any] = Field(default={}, serialization_alias="metadata", validation_alias="metadata")
 
@@ -37,6 +38,7 @@ class ContentUpdate(BaseModel):
     meta_title: Optional[str] = None
     meta_description: Optional[str] = None
     meta_keywords: Optional[List[str]] = None
+    search_config: Optional[str] = Field(default=None, max_length=64)
     scheduled_for: Optional[datetime] = None
     meta_data: Optional[Dict[str, Any]] = Field(default=None, serialization_alias="metadata", validation_alias="metadata")
 
@@ -59,6 +61,7 @@ class ContentResponse(BaseModel):
     meta_title: Optional[str]
     meta_description: Optional[str]
     meta_keywords: Optional[List[str]]
+    search_config: Optional[str] = None
     published_at: Optional[datetime]
     scheduled_for: Optional[datetime]
     view_count: int
@@ -72,6 +75,21 @@ class ContentResponse(BaseModel):
         from_attributes = True
 
 
+# 内容搜索结果
+class ContentSearchResult(BaseModel):
+    id: uuid.UUID
+    title: str
+    slug: str
+    content_type: str
+    status: str
+    excerpt: Optional[str]
+    published_at: Optional[datetime]
+    created_at: datetime
+    rank: float
+    headline: str
+    match: str
+
+
 # 术语创建
 class TermCreate(BaseModel):
     taxonomy_id: uuid.UUID
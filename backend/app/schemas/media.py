@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 import uuid
 
@@ -30,6 +30,16 @@ class MediaUpdate(BaseModel):
     meta_data: Optional[Dict[str, Any]] = Field(default=None, serialization_alias="metadata", validation_alias="metadata")
 
 
+# 衍生图片
+class MediaVariant(BaseModel):
+    width: int
+    height: Optional[int] = None
+    format: str
+    url: str
+    file_size: Optional[int] = None
+    generated: bool = False
+
+
 # 媒体响应
 class MediaResponse(BaseModel):
     id: uuid.UUID
@@ -42,6 +52,8 @@ class MediaResponse(BaseModel):
     width: Optional[int]
     height: Optional[int]
     duration: Optional[int]
+    content_hash: Optional[str] = None
+    variants: List[MediaVariant] = []
     alt_text: Optional[str]
     caption: Optional[str]
     description: Optional[str]
@@ -93,3 +93,24 @@ class ModuleDataResponse(BaseModel):
 class PageModuleFull(PageModuleResponse):
     module_data: List[ModuleDataResponse] = []
     module_type: Optional[ModuleTypeResponse] = None
+
+
+# 菜单树节点
+class MenuItemNode(BaseModel):
+    id: uuid.UUID
+    title: str
+    url: Optional[str]
+    target: Optional[str]
+    css_classes: Optional[List[str]]
+    icon_class: Optional[str]
+    item_order: int
+    children: List["MenuItemNode"] = []
+
+
+# 某个位置的菜单及其完整的菜单项树
+class MenuTree(BaseModel):
+    id: uuid.UUID
+    name: str
+    slug: str
+    location: str
+    items: List[MenuItemNode] = []
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Any
+from datetime import datetime
+import uuid
+
+
+# 选项写入
+class OptionUpdate(BaseModel):
+    option_value: Any
+    description: Optional[str] = None
+    is_public: Optional[bool] = None
+    autoload: Optional[bool] = None
+    data_type: Optional[str] = Field(default=None, max_length=20)
+
+
+# 选项响应
+class OptionResponse(BaseModel):
+    id: uuid.UUID
+    option_name: str
+    option_value: Any
+    description: Optional[str]
+    is_public: bool
+    autoload: bool
+    data_type: str
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
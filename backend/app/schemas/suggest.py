@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+# 输入建议
+class SuggestResult(BaseModel):
+    type: str
+    id: str
+    label: str
+    slug: Optional[str] = None
+    content_type: Optional[str] = None
+    status: Optional[str] = None
+    taxonomy_id: Optional[str] = None
+    username: Optional[str] = None
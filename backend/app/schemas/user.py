@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, FrozenSet
 from datetime import datetime
 import uuid
 
@@ -63,3 +63,15 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     user_id: Optional[str] = None
+
+
+# 已认证用户(缓存在进程内,不包含完整的用户资料)
+class UserPrincipal(BaseModel):
+    id: uuid.UUID
+    is_active: bool
+    roles: FrozenSet[str] = frozenset()
+    permissions: FrozenSet[str] = frozenset()
+    roles_expire_at: Optional[datetime] = None  # 最早到期的角色的到期时间
+    
+    class Config:
+        frozen = True
@@ -0,0 +1,127 @@
+"""评论线程加载基准测试
+
+向指定内容批量写入一棵随机评论树(默认10000条),然后多次执行线程加载查询并输出耗时。
+写入的评论带有metadata.bench标记,加上--cleanup时测试结束后删除。
+注意: 写入的评论为approved状态,会计入内容的comment_count和当天的评论统计。
+
+用法(在backend目录下执行):
+    python -m app.scripts.bench_comments --content-id <UUID> [--comments 10000] [--roots 1000] [--runs 20] [--cleanup]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, insert
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.comment import Comment
+from ..core.comments import load_threads, load_replies
+
+BATCH_SIZE = 1000
+
+
+def build_tree(content_id: uuid.UUID, comments: int, roots: int, run_id: str):
+    """生成随机评论树(回复只挂在未达到最大层级的评论下)"""
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    rows = []
+    depth = {}
+    for i in range(comments):
+        parents = [row["id"] for row in rows[-200:] if depth[row["id"]] < settings.COMMENT_MAX_DEPTH]
+        parent_id = random.choice(parents) if i >= roots and parents else None
+        id = uuid.uuid4()
+        depth[id] = depth[parent_id] + 1 if parent_id else 0
+        rows.append({
+            "id": id,
+            "content_id": content_id,
+            "parent_id": parent_id,
+            "author_name": f"bench-{i}",
+            "author_email": "bench@example.com",
+            "author_ip": "127.0.0.1",
+            "content": "benchmark comment",
+            "status": "approved",
+            "is_pinned": False,
+            "like_count": 0,
+            "reply_count": 0,
+            "created_at": start + timedelta(seconds=i),
+            "meta_data": {"bench": run_id}
+        })
+    return rows
+
+
+async def seed(content_id: uuid.UUID, comments: int, roots: int, run_id: str) -> int:
+    rows = build_tree(content_id, comments, roots, run_id)
+    replies = {}
+    for row in rows:
+        if row["parent_id"]:
+            replies[row["parent_id"]] = replies.get(row["parent_id"], 0) + 1
+    for row in rows:
+        row["reply_count"] = replies.get(row["id"], 0)
+    
+    async with AsyncSessionLocal() as db:
+        for i in range(0, len(rows), BATCH_SIZE):
+            await db.execute(insert(Comment), rows[i:i + BATCH_SIZE])
+        await db.commit()
+    return len(rows)
+
+
+async def measure(label: str, runs: int, fn):
+    timings = []
+    for _ in range(runs):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await fn(db)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label}: 中位数 {statistics.median(timings):.1f}ms, p95 {p95:.1f}ms")
+
+
+async def run(args):
+    run_id = uuid.uuid4().hex
+    seeded = await seed(args.content_id, args.comments, args.roots, run_id)
+    print(f"已写入 {seeded} 条评论")
+    
+    try:
+        async with AsyncSessionLocal() as db:
+            threads, cursor = await load_threads(db, args.content_id, args.limit, args.replies)
+        deep_root = max(threads, key=lambda t: t["reply_total"])["comment"].id if threads else None
+        
+        await measure(
+            f"第一页线程({args.limit}个线程,每个最多{args.replies}条回复)", args.runs,
+            lambda db: load_threads(db, args.content_id, args.limit, args.replies)
+        )
+        if cursor:
+            await measure(
+                "第二页线程", args.runs,
+                lambda db: load_threads(db, args.content_id, args.limit, args.replies, cursor)
+            )
+        if deep_root:
+            await measure(
+                "单个线程的回复分页", args.runs,
+                lambda db: load_replies(db, deep_root, args.limit)
+            )
+    finally:
+        if args.cleanup:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(Comment).where(Comment.meta_data["bench"].astext == run_id))
+                await db.commit()
+            print("已删除测试评论")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="评论线程加载基准测试")
+    parser.add_argument("--content-id", type=uuid.UUID, required=True, help="写入评论的内容id")
+    parser.add_argument("--comments", type=int, default=10000, help="写入的评论总数")
+    parser.add_argument("--roots", type=int, default=1000, help="其中顶层评论的数量")
+    parser.add_argument("--limit", type=int, default=20, help="每页线程数")
+    parser.add_argument("--replies", type=int, default=10, help="每个线程加载的回复数")
+    parser.add_argument("--runs", type=int, default=20, help="每项测试的执行次数")
+    parser.add_argument("--cleanup", action="store_true", help="结束后删除写入的评论")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""重新计算已上传文件的内容哈希,迁移到内容寻址存储并去重
+
+用法(在backend目录下执行):
+    python -m app.scripts.dedupe_media [--batch-size 500] [--dry-run]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import shutil
+from typing import Dict, List, Set
+from sqlalchemy import select, update, text
+from ..database import AsyncSessionLocal
+from ..models.media import Media
+from ..core.storage import blob_path, upload_url
+
+
+def file_sha256(path: str, chunk_size: int = 1048576) -> str:
+    """分块计算文件SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def materialize(src: str, dest: str):
+    """在目标路径放置一份文件(优先使用硬链接,避免复制)"""
+    if os.path.exists(dest):
+        return
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+async def ensure_schema(db):
+    """为已有数据库补充content_hash列和索引"""
+    await db.execute(text("ALTER TABLE media ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"))
+    await db.execute(text("CREATE INDEX IF NOT EXISTS idx_media_content_hash ON media(content_hash)"))
+    await db.commit()
+
+
+async def dedupe(batch_size: int, dry_run: bool):
+    stats = {"scanned": 0, "missing": 0, "moved": 0, "deduplicated": 0, "bytes_reclaimed": 0}
+    # 本次运行中每个哈希对应的规范文件路径
+    canonical: Dict[str, str] = {}
+    # 已经放置好的规范文件,以及已经整体改指向的旧路径
+    placed: Set[str] = set()
+    redirected: Set[str] = set()
+    last_id = None
+    
+    async with AsyncSessionLocal() as db:
+        if not dry_run:
+            await ensure_schema(db)
+        
+        while True:
+            query = select(Media.id, Media.file_path).order_by(Media.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(Media.id > last_id)
+            rows = (await db.execute(query)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            
+            # 提交后才删除的旧文件
+            obsolete: List[str] = []
+            
+            for media_id, file_path in rows:
+                stats["scanned"] += 1
+                if file_path in redirected:
+                    continue
+                if not await asyncio.to_thread(os.path.exists, file_path):
+                    stats["missing"] += 1
+                    print(f"文件不存在,跳过: {file_path}")
+                    continue
+                
+                sha256 = await asyncio.to_thread(file_sha256, file_path)
+                target = canonical.setdefault(
+                    sha256,
+                    blob_path(sha256, os.path.splitext(file_path)[1])
+                )
+                
+                if file_path != target:
+                    if target in placed or await asyncio.to_thread(os.path.exists, target):
+                        stats["deduplicated"] += 1
+                        stats["bytes_reclaimed"] += await asyncio.to_thread(os.path.getsize, file_path)
+                    else:
+                        stats["moved"] += 1
+                    if not dry_run:
+                        await asyncio.to_thread(materialize, file_path, target)
+                        obsolete.append(file_path)
+                    placed.add(target)
+                    redirected.add(file_path)
+                
+                if dry_run:
+                    continue
+                
+                # 所有引用旧路径的记录一起指向规范文件
+                await db.execute(
+                    update(Media)
+                    .where(Media.file_path.in_([file_path, target]))
+                    .values(
+                        file_path=target,
+                        file_url=upload_url(target),
+                        filename=os.path.basename(target),
+                        content_hash=sha256
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            
+            if not dry_run:
+                await db.commit()
+                for path in obsolete:
+                    try:
+                        await asyncio.to_thread(os.remove, path)
+                    except OSError as e:
+                        print(f"删除旧文件失败: {path}: {e}")
+            
+            print(f"已处理 {stats['scanned']} 条媒体记录")
+    
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="迁移上传文件到内容寻址存储并去重")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批处理的媒体记录数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计,不修改文件和数据库")
+    args = parser.parse_args()
+    
+    stats = asyncio.run(dedupe(args.batch_size, args.dry_run))
+    print(
+        f"完成: 扫描 {stats['scanned']}, 缺失 {stats['missing']}, 迁移 {stats['moved']}, "
+        f"去重 {stats['deduplicated']}, 释放 {stats['bytes_reclaimed']} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""为已有数据库补充content.search_vector并分批重建全文检索向量
+
+每批只更新batch-size行并立即提交,行锁持有时间很短,不会长时间阻塞写入;
+GIN索引在回填完成后以CONCURRENTLY方式创建。
+注意: content表的updated_at触发器会把被回填行的updated_at更新为当前时间。
+
+用法(在backend目录下执行):
+    python -m app.scripts.rebuild_search_vectors [--batch-size 1000] [--only-missing] [--pause 0.1]
+"""
+import argparse
+import asyncio
+import uuid
+from sqlalchemy import text
+from ..database import AsyncSessionLocal, async_engine
+
+SCHEMA_STATEMENTS = [
+    "ALTER TABLE content ADD COLUMN IF NOT EXISTS search_config VARCHAR(64) NOT NULL DEFAULT 'simple'",
+    "ALTER TABLE content ADD COLUMN IF NOT EXISTS search_vector TSVECTOR",
+    """
+    CREATE OR REPLACE FUNCTION build_content_search_vector(
+        config REGCONFIG, title TEXT, excerpt TEXT, body TEXT, keywords TEXT[]
+    )
+    RETURNS TSVECTOR AS $$
+        SELECT setweight(to_tsvector(config, COALESCE(title, '')), 'A') ||
+               setweight(to_tsvector(config, COALESCE(array_to_string(keywords, ' '), '')), 'A') ||
+               setweight(to_tsvector(config, COALESCE(excerpt, '')), 'B') ||
+               setweight(to_tsvector(config, regexp_replace(COALESCE(body, ''), '<[^>]*>', ' ', 'g')), 'C');
+    $$ LANGUAGE sql IMMUTABLE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION update_content_search_vector()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        NEW.search_vector = build_content_search_vector(
+            NEW.search_config::regconfig, NEW.title, NEW.excerpt, NEW.content, NEW.meta_keywords
+        );
+        RETURN NEW;
+    END;
+    $$ language 'plpgsql'
+    """,
+    "DROP TRIGGER IF EXISTS content_search_vector_trigger ON content",
+    """
+    CREATE TRIGGER content_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, excerpt, content, meta_keywords, search_config ON content
+        FOR EACH ROW EXECUTE FUNCTION update_content_search_vector()
+    """,
+]
+
+# CONCURRENTLY不能在事务中执行
+INDEX_STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_content_search_vector ON content USING GIN(search_vector)",
+    "DROP INDEX CONCURRENTLY IF EXISTS idx_content_search",
+]
+
+
+async def ensure_schema(db):
+    """补充列、函数和触发器(新写入的内容从此由触发器维护)"""
+    for statement in SCHEMA_STATEMENTS:
+        await db.execute(text(statement))
+    await db.commit()
+
+
+async def ensure_indexes():
+    """创建search_vector索引并删除旧的表达式索引"""
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for statement in INDEX_STATEMENTS:
+            await conn.execute(text(statement))
+
+
+async def rebuild(batch_size: int, only_missing: bool, pause: float) -> int:
+    updated = 0
+    last_id = uuid.UUID(int=0)
+    missing_filter = "AND search_vector IS NULL" if only_missing else ""
+    
+    async with AsyncSessionLocal() as db:
+        await ensure_schema(db)
+        
+        while True:
+            ids = (await db.execute(
+                text(f"""
+                    UPDATE content
+                    SET search_vector = build_content_search_vector(
+                        search_config::regconfig, title, excerpt, content, meta_keywords
+                    )
+                    WHERE id IN (
+                        SELECT id FROM content
+                        WHERE id > :last_id {missing_filter}
+                        ORDER BY id
+                        LIMIT :batch_size
+                    )
+                    RETURNING id
+                """),
+                {"last_id": last_id, "batch_size": batch_size}
+            )).scalars().all()
+            await db.commit()
+            if not ids:
+                break
+            
+            updated += len(ids)
+            last_id = max(ids)
+            print(f"已重建 {updated} 条内容的检索向量")
+            if pause:
+                await asyncio.sleep(pause)
+    
+    await ensure_indexes()
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分批重建内容全文检索向量")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批更新的内容数")
+    parser.add_argument("--only-missing", action="store_true", help="只处理还没有检索向量的内容")
+    parser.add_argument("--pause", type=float, default=0.0, help="每批之间暂停的秒数")
+    args = parser.parse_args()
+    
+    updated = asyncio.run(rebuild(args.batch_size, args.only_missing, args.pause))
+    print(f"完成: 共重建 {updated} 条内容")
+
+
+if __name__ == "__main__":
+    main()
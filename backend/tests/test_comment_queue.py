@@ -0,0 +1,106 @@
+"""评论队列批量写入时的回复对象解析"""
+import uuid
+from datetime import datetime, timedelta, timezone
+from .conftest import requires_db, run, create_user, create_content, delete_user
+
+pytestmark = requires_db
+
+
+def _payload(content: str, parent_id=None):
+    return {
+        "author_name": "访客",
+        "author_email": "guest@example.com",
+        "author_ip": "127.0.0.1",
+        "content": content,
+        "parent_id": str(parent_id) if parent_id else None
+    }
+
+
+def _ingestor():
+    from app.core.comment_queue import CommentIngestor
+    
+    return CommentIngestor(batch_size=10, poll_interval=1, scorer=lambda row: 0.0, spam_threshold=0.8)
+
+
+async def _queue(db, content_id, submissions):
+    from app.models.comment import CommentSubmission
+    
+    start = datetime.now(timezone.utc)
+    db.add_all([
+        CommentSubmission(id=id, content_id=content_id, payload=payload, created_at=start + timedelta(seconds=i))
+        for i, (id, payload) in enumerate(submissions)
+    ])
+    await db.flush()
+
+
+def test_reply_to_comment_in_same_batch():
+    from sqlalchemy import select
+    from app.database import AsyncSessionLocal
+    from app.models.comment import Comment
+    
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user_id = await create_user(db)
+            content_id = await create_content(db, user_id)
+            ids = [uuid.uuid4() for _ in range(3)]
+            await _queue(db, content_id, [
+                (ids[0], _payload("顶层评论")),
+                (ids[1], _payload("回复", ids[0])),
+                (ids[2], _payload("回复的回复", ids[1]))
+            ])
+            await db.commit()
+        
+        try:
+            ingestor = _ingestor()
+            assert await ingestor.process_batch() == 3
+            assert ingestor.dropped == 0
+            async with AsyncSessionLocal() as db:
+                parents = dict((await db.execute(
+                    select(Comment.id, Comment.parent_id).where(Comment.id.in_(ids))
+                )).all())
+            assert parents == {ids[0]: None, ids[1]: ids[0], ids[2]: ids[1]}
+        finally:
+            async with AsyncSessionLocal() as db:
+                await delete_user(db, user_id)
+                await db.commit()
+    
+    run(scenario())
+
+
+def test_reply_to_comment_claimed_by_another_worker_is_requeued():
+    from sqlalchemy import select, delete
+    from app.database import AsyncSessionLocal
+    from app.models.comment import Comment, CommentSubmission
+    
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user_id = await create_user(db)
+            content_id = await create_content(db, user_id)
+            parent_id, reply_id = uuid.uuid4(), uuid.uuid4()
+            await _queue(db, content_id, [
+                (parent_id, _payload("顶层评论")),
+                (reply_id, _payload("回复", parent_id))
+            ])
+            await db.commit()
+        
+        try:
+            ingestor = _ingestor()
+            # 另一个副本已认领回复对象但尚未提交
+            async with AsyncSessionLocal() as other:
+                await other.execute(
+                    select(CommentSubmission.id).where(CommentSubmission.id == parent_id).with_for_update()
+                )
+                assert await ingestor.process_batch() == 0
+                assert ingestor.requeued == 1
+            
+            assert await ingestor.process_batch() == 2
+            assert ingestor.dropped == 0
+            async with AsyncSessionLocal() as db:
+                assert await db.scalar(select(Comment.parent_id).where(Comment.id == reply_id)) == parent_id
+        finally:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(CommentSubmission).where(CommentSubmission.id.in_([parent_id, reply_id])))
+                await delete_user(db, user_id)
+                await db.commit()
+    
+    run(scenario())
@@ -0,0 +1,39 @@
+"""NDJSON内容导入的逐行错误报告"""
+import json
+import uuid
+from .conftest import requires_db, run, create_user, delete_user
+
+pytestmark = requires_db
+
+
+async def _stream(lines):
+    yield "".join(json.dumps(line) + "\n" for line in lines).encode()
+
+
+def test_invalid_rows_are_reported_without_failing_the_batch():
+    from app.database import AsyncSessionLocal
+    from app.core.content_transfer import ContentImporter
+    
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user_id = await create_user(db)
+            await db.commit()
+        
+        try:
+            importer = ContentImporter(author_id=user_id, batch_size=10)
+            summary = await importer.run(_stream([
+                {"title": "正常一", "content": "正文"},
+                {"title": "未知检索配置", "content": "正文", "search_config": "no_such_config"},
+                {"title": "父内容不存在", "content": "正文", "parent_id": str(uuid.uuid4())},
+                {"title": "正常二", "content": "正文"}
+            ]))
+            assert summary["imported"] == 2
+            assert summary["failed"] == 2
+            assert [error["line"] for error in summary["errors"]] == [2, 3]
+            assert "search_config" in summary["errors"][0]["error"]
+        finally:
+            async with AsyncSessionLocal() as db:
+                await delete_user(db, user_id)
+                await db.commit()
+    
+    run(scenario())
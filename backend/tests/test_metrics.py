@@ -0,0 +1,38 @@
+"""运行指标接口的访问控制"""
+import uuid
+import pytest
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    
+    # 不进入上下文,不触发启动事件(后台任务需要数据库)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _login_as(permissions):
+    from app.main import app
+    from app.core.security import get_current_active_user
+    from app.schemas.user import UserPrincipal
+    
+    principal = UserPrincipal(id=uuid.uuid4(), is_active=True, permissions=frozenset(permissions))
+    app.dependency_overrides[get_current_active_user] = lambda: principal
+
+
+def test_metrics_requires_authentication(client):
+    assert client.get("/metrics").status_code == 401
+
+
+def test_metrics_requires_settings_permission(client):
+    _login_as({"content.update"})
+    assert client.get("/metrics").status_code == 403
+
+
+def test_metrics_for_settings_managers(client):
+    _login_as({"settings.manage"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "password_hashing" in response.json()
@@ -0,0 +1,80 @@
+"""页面模块树加载的查询次数"""
+import uuid
+from .conftest import requires_db, run, QueryCounter, create_user, create_content, delete_user
+
+pytestmark = requires_db
+
+
+async def _seed_modules(db, content_id, module_type_ids, per_type: int):
+    from app.models.module import PageModule, ModuleData
+    
+    modules = []
+    for order in range(per_type):
+        for type_id in module_type_ids:
+            module = PageModule(content_id=content_id, module_type_id=type_id, module_order=len(modules))
+            db.add(module)
+            modules.append(module)
+    await db.flush()
+    for module in modules:
+        db.add_all([
+            ModuleData(page_module_id=module.id, data_key="title", data_value={"text": "标题"}),
+            ModuleData(page_module_id=module.id, data_key="body", data_value={"text": "正文"})
+        ])
+    await db.flush()
+    return modules
+
+
+def test_load_module_tree_query_count_independent_of_module_count():
+    from sqlalchemy import delete
+    from app.database import AsyncSessionLocal, async_engine
+    from app.models.module import ModuleType
+    from app.api.v1.modules import load_module_tree
+    from app.core.module_type_cache import module_type_cache
+    
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user_id = await create_user(db)
+            content_id = await create_content(db, user_id)
+            module_types = [
+                ModuleType(name=f"test_{uuid.uuid4().hex[:12]}", display_name="测试模块", schema={})
+                for _ in range(2)
+            ]
+            db.add_all(module_types)
+            await db.flush()
+            type_ids = [module_type.id for module_type in module_types]
+            small = await _seed_modules(db, content_id, type_ids, per_type=1)
+            large = small + await _seed_modules(db, content_id, type_ids, per_type=10)
+            await db.commit()
+        
+        try:
+            module_type_cache.invalidate()
+            async with AsyncSessionLocal() as db:
+                # 冷缓存: 模块数据一条IN查询 + 模块类型整表加载一条
+                with QueryCounter(async_engine) as counter:
+                    tree = await load_module_tree(db, small)
+                assert counter.count == 2
+                assert all(len(module["module_data"]) == 2 for module in tree)
+                assert {module["module_type"].id for module in tree} == set(type_ids)
+                
+                # 热缓存: 无论模块多少,只查询模块数据
+                with QueryCounter(async_engine) as counter:
+                    tree = await load_module_tree(db, large)
+                assert counter.count == 1
+                assert len(tree) == len(large)
+                assert all(len(module["module_data"]) == 2 for module in tree)
+                
+                # 未知的模块类型id触发一次重新加载,而不是逐个查询
+                module_type_cache.invalidate()
+                await module_type_cache.get_many(db, type_ids[:1])
+                with QueryCounter(async_engine) as counter:
+                    types = await module_type_cache.get_many(db, type_ids)
+                assert counter.count == 1
+                assert set(types) == set(type_ids)
+        finally:
+            module_type_cache.invalidate()
+            async with AsyncSessionLocal() as db:
+                await delete_user(db, user_id)
+                await db.execute(delete(ModuleType).where(ModuleType.id.in_(type_ids)))
+                await db.commit()
+    
+    run(scenario())
@@ -0,0 +1,38 @@
+"""系统选项的懒加载缓存"""
+import uuid
+from .conftest import requires_db, run
+
+pytestmark = requires_db
+
+
+def test_json_null_option_is_cached():
+    from sqlalchemy import text
+    from app.database import AsyncSessionLocal
+    from app.core.options import OptionsService
+    
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                text("INSERT INTO options (option_name, option_value, autoload) VALUES (:name, 'null', false)"),
+                {"name": name}
+            )
+            await db.commit()
+        
+        try:
+            service = OptionsService(lazy_maxsize=10, lazy_ttl=60)
+            assert await service.get(name, "默认值") is None
+            assert await service.get(name, "默认值") is None
+            assert (service.lazy_misses, service.lazy_hits) == (1, 1)
+            
+            # 不存在的选项同样只查询一次
+            assert await service.get(f"{name}_missing", "默认值") == "默认值"
+            assert await service.get(f"{name}_missing", "默认值") == "默认值"
+            assert (service.lazy_misses, service.lazy_hits) == (2, 2)
+        finally:
+            async with AsyncSessionLocal() as db:
+                await db.execute(text("DELETE FROM options WHERE option_name = :name"), {"name": name})
+                await db.commit()
+    
+    run(scenario())
@@ -0,0 +1,24 @@
+"""权限名规范化与检查"""
+import uuid
+
+
+def test_normalize_permission_maps_separator_and_aliases():
+    from app.core.security import normalize_permission
+    
+    assert normalize_permission("content.update") == "content.update"
+    assert normalize_permission("content:update") == "content.update"
+    assert normalize_permission("content:edit") == "content.update"
+    assert normalize_permission("content.edit") == "content.update"
+    assert normalize_permission("content:view") == "content.read"
+    assert normalize_permission("content:remove") == "content.delete"
+    assert normalize_permission("comments:moderate") == "comments.moderate"
+
+
+def test_has_permission_accepts_aliases():
+    from app.core.security import has_permission
+    from app.schemas.user import UserPrincipal
+    
+    user = UserPrincipal(id=uuid.uuid4(), is_active=True, permissions=frozenset({"content.update"}))
+    assert has_permission(user, "content:edit")
+    assert has_permission(user, "content.update")
+    assert not has_permission(user, "content:delete")
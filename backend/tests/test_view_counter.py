@@ -0,0 +1,62 @@
+"""浏览计数缓冲刷新"""
+import asyncio
+from .conftest import requires_db, run, create_user, create_content, delete_user
+
+
+def test_stop_logs_failed_final_flush(capsys):
+    from app.core.view_counter import ViewCounter
+    
+    async def failing_flush():
+        raise RuntimeError("数据库不可用")
+    
+    counter = ViewCounter(flush_interval=60, max_buffer=1000)
+    counter.flush = failing_flush
+    asyncio.run(counter.stop())
+    assert "数据库不可用" in capsys.readouterr().out
+
+
+@requires_db
+def test_flush_drops_views_of_deleted_content():
+    from sqlalchemy import select, delete
+    from app.database import AsyncSessionLocal
+    from app.models.content import Content
+    from app.models.stats import DailyContentStats
+    from app.core.view_counter import ViewCounter
+    from app.core.stats_rollup import utc_today
+    
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user_id = await create_user(db)
+            kept_id = await create_content(db, user_id)
+            deleted_id = await create_content(db, user_id)
+            await db.commit()
+        
+        try:
+            counter = ViewCounter(flush_interval=60, max_buffer=1000)
+            await counter.incr(kept_id, 3)
+            await counter.incr(deleted_id, 2)
+            
+            # 计数还在缓冲区时内容被删除
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(Content).where(Content.id == deleted_id))
+                await db.commit()
+            
+            await counter.flush()
+            # 已删除内容的计数被丢弃,不会放回缓冲区拖累之后的刷新
+            assert await counter._take() == {}
+            
+            async with AsyncSessionLocal() as db:
+                assert await db.scalar(select(Content.view_count).where(Content.id == kept_id)) == 3
+                stats = (await db.execute(
+                    select(DailyContentStats.content_id, DailyContentStats.views).where(
+                        DailyContentStats.day == utc_today(),
+                        DailyContentStats.content_id.in_([kept_id, deleted_id])
+                    )
+                )).all()
+                assert stats == [(kept_id, 3)]
+        finally:
+            async with AsyncSessionLocal() as db:
+                await delete_user(db, user_id)
+                await db.commit()
+    
+    run(scenario())
@@ -119,6 +119,10 @@ CREATE TABLE content (
     meta_description VARCHAR(160),
     meta_keywords TEXT[],
     
+    -- 全文检索(由触发器维护)
+    search_config VARCHAR(64) NOT NULL DEFAULT 'simple', -- 文本搜索配置，如 'simple'、'english'，安装中文分词扩展后可使用对应配置
+    search_vector TSVECTOR,
+    
     -- 发布信息
     published_at TIMESTAMPTZ,
     scheduled_for TIMESTAMPTZ,
@@ -174,6 +178,26 @@ CREATE TABLE content_terms (
     UNIQUE(content_id, term_id)
 );
 
+-- 内容每日统计表（浏览/点赞/评论增量汇总）
+CREATE TABLE daily_content_stats (
+    day DATE NOT NULL,
+    content_id UUID NOT NULL REFERENCES content(id) ON DELETE CASCADE,
+    views INTEGER NOT NULL DEFAULT 0,
+    likes INTEGER NOT NULL DEFAULT 0,
+    comments INTEGER NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (day, content_id)
+);
+
+-- 全站每日统计表（由 daily_content_stats 定期压缩生成）
+CREATE TABLE daily_site_stats (
+    day DATE PRIMARY KEY,
+    views BIGINT NOT NULL DEFAULT 0,
+    likes BIGINT NOT NULL DEFAULT 0,
+    comments BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
 -- =============================================
 -- 3. 媒体管理模块
 -- =============================================
@@ -190,6 +214,7 @@ CREATE TABLE media (
     width INTEGER, -- 图片宽度
     height INTEGER, -- 图片高度
     duration INTEGER, -- 视频/音频时长（秒）
+    content_hash VARCHAR(64), -- 文件内容SHA-256，用于去重
     
     -- 媒体元数据
     alt_text TEXT,
@@ -275,6 +300,14 @@ CREATE TABLE comment_metadata (
     UNIQUE(comment_id, meta_key)
 );
 
+-- 评论提交队列(后台任务按批写入comments表,id即写入后的评论id)
+CREATE TABLE comment_queue (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    content_id UUID NOT NULL,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
 -- =============================================
 -- 5. 系统设置模块
 -- =============================================
@@ -292,6 +325,9 @@ CREATE TABLE options (
     updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
+-- 选项版本号(options表每次写入递增)
+CREATE SEQUENCE options_version_seq;
+
 -- 设置项表（结构化配置）
 CREATE TABLE settings (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -402,6 +438,7 @@ CREATE INDEX idx_users_username ON users(username);
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_status ON users(is_active, is_verified);
 CREATE INDEX idx_users_last_login ON users(last_login_at);
+CREATE INDEX idx_users_created ON users(created_at DESC, id DESC);
 CREATE INDEX idx_users_metadata ON users USING GIN(metadata);
 
 -- 内容表索引
@@ -409,10 +446,12 @@ CREATE INDEX idx_content_type_status ON content(content_type, status);
 CREATE INDEX idx_content_author ON content(author_id);
 CREATE INDEX idx_content_parent ON content(parent_id);
 CREATE INDEX idx_content_published ON content(published_at DESC);
+CREATE INDEX idx_content_created ON content(created_at DESC, id DESC);
 CREATE INDEX idx_content_scheduled ON content(scheduled_for) WHERE status = 'scheduled';
 CREATE INDEX idx_content_slug ON content(slug);
 CREATE INDEX idx_content_metadata ON content USING GIN(metadata);
-CREATE INDEX idx_content_search ON content USING GIN(to_tsvector('english', title || ' ' || COALESCE(excerpt, '')));
+CREATE INDEX idx_content_search_vector ON content USING GIN(search_vector);
+CREATE INDEX idx_content_title_trgm ON content USING GIN(title gin_trgm_ops);
 
 -- 分类法索引
 CREATE INDEX idx_terms_taxonomy ON terms(taxonomy_id);
@@ -424,19 +463,26 @@ CREATE INDEX idx_content_terms_content ON content_terms(content_id);
 CREATE INDEX idx_content_terms_term ON content_terms(term_id);
 CREATE INDEX idx_content_terms_order ON content_terms(content_id, term_order);
 
+-- 每日统计索引
+CREATE INDEX idx_daily_content_stats_content ON daily_content_stats(content_id, day);
+
 -- 媒体表索引
 CREATE INDEX idx_media_mime_type ON media(mime_type);
 CREATE INDEX idx_media_status ON media(status);
-CREATE INDEX idx_media_created ON media(created_at DESC);
+CREATE INDEX idx_media_created ON media(created_at DESC, id DESC);
+CREATE INDEX idx_media_content_hash ON media(content_hash);
 CREATE INDEX idx_media_metadata ON media USING GIN(metadata);
 
 -- 评论表索引
 CREATE INDEX idx_comments_content ON comments(content_id);
 CREATE INDEX idx_comments_status ON comments(status);
 CREATE INDEX idx_comments_parent ON comments(parent_id);
+CREATE INDEX idx_comments_threads ON comments(content_id, is_pinned DESC, created_at DESC, id DESC)
+    WHERE parent_id IS NULL AND status = 'approved';
 CREATE INDEX idx_comments_created ON comments(created_at DESC);
 CREATE INDEX idx_comments_approved ON comments(approved_by, approved_at);
 CREATE INDEX idx_comments_metadata ON comments USING GIN(metadata);
+CREATE INDEX idx_comment_queue_created ON comment_queue(created_at);
 
 -- 设置表索引
 CREATE INDEX idx_options_autoload ON options(autoload) WHERE autoload = true;
@@ -538,10 +584,41 @@ CREATE TRIGGER content_publication_status_trigger
     BEFORE UPDATE ON content
     FOR EACH ROW EXECUTE FUNCTION check_content_publication_status();
 
+-- 内容全文检索向量：标题和关键词权重A，摘要B，正文C(去除HTML标签)
+CREATE OR REPLACE FUNCTION build_content_search_vector(
+    config REGCONFIG, title TEXT, excerpt TEXT, body TEXT, keywords TEXT[]
+)
+RETURNS TSVECTOR AS $$
+    SELECT setweight(to_tsvector(config, COALESCE(title, '')), 'A') ||
+           setweight(to_tsvector(config, COALESCE(array_to_string(keywords, ' '), '')), 'A') ||
+           setweight(to_tsvector(config, COALESCE(excerpt, '')), 'B') ||
+           setweight(to_tsvector(config, regexp_replace(COALESCE(body, ''), '<[^>]*>', ' ', 'g')), 'C');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- 只在检索相关字段变化时重新计算，浏览数等计数更新不会触发
+CREATE OR REPLACE FUNCTION update_content_search_vector()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector = build_content_search_vector(
+        NEW.search_config::regconfig, NEW.title, NEW.excerpt, NEW.content, NEW.meta_keywords
+    );
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER content_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, excerpt, content, meta_keywords, search_config ON content
+    FOR EACH ROW EXECUTE FUNCTION update_content_search_vector();
+
 -- 评论状态更新时同步内容评论计数
+-- 评论队列批量写入时设置 cms.comment_batch = 'on',由写入方按内容汇总更新,逐行触发器跳过
 CREATE OR REPLACE FUNCTION update_content_comment_count()
 RETURNS TRIGGER AS $$
 BEGIN
+    IF current_setting('cms.comment_batch', true) = 'on' THEN
+        RETURN COALESCE(NEW, OLD);
+    END IF;
+    
     IF TG_OP = 'INSERT' AND NEW.status = 'approved' THEN
         UPDATE content SET comment_count = comment_count + 1 WHERE id = NEW.content_id;
     ELSIF TG_OP = 'UPDATE' AND OLD.status != NEW.status THEN
@@ -562,6 +639,99 @@ CREATE TRIGGER comment_count_trigger
     AFTER INSERT OR UPDATE OR DELETE ON comments
     FOR EACH ROW EXECUTE FUNCTION update_content_comment_count();
 
+-- 评论审核通过时累加当天(UTC日期,与应用侧统计一致)的内容评论统计
+CREATE OR REPLACE FUNCTION update_daily_comment_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('cms.comment_batch', true) = 'on' THEN
+        RETURN NEW;
+    END IF;
+    
+    IF NEW.status = 'approved' AND (TG_OP = 'INSERT' OR OLD.status != 'approved') THEN
+        INSERT INTO daily_content_stats (day, content_id, comments)
+        VALUES (timezone('UTC', now())::date, NEW.content_id, 1)
+        ON CONFLICT (day, content_id)
+        DO UPDATE SET comments = daily_content_stats.comments + 1;
+    END IF;
+    
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER daily_comment_stats_trigger
+    AFTER INSERT OR UPDATE OF status ON comments
+    FOR EACH ROW EXECUTE FUNCTION update_daily_comment_stats();
+
+-- 选项变更时递增版本号并通知各worker重新加载选项快照
+CREATE OR REPLACE FUNCTION notify_options_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('cms_options', nextval('options_version_seq')::text);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER options_changed_trigger
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON options
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_options_changed();
+
+-- 角色或权限变更时通知各worker清空已认证用户缓存
+CREATE OR REPLACE FUNCTION notify_rbac_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('cms_rbac', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER roles_changed_trigger
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON roles
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rbac_changed();
+
+CREATE TRIGGER permissions_changed_trigger
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON permissions
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rbac_changed();
+
+CREATE TRIGGER user_roles_changed_trigger
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON user_roles
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rbac_changed();
+
+CREATE TRIGGER role_permissions_changed_trigger
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON role_permissions
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_rbac_changed();
+
+-- 菜单或菜单项变更时通知各worker使对应的菜单缓存失效(通知内容为缓存标签)
+CREATE OR REPLACE FUNCTION notify_menu_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'menus' THEN
+        IF TG_OP <> 'INSERT' THEN
+            PERFORM pg_notify('cms_menus', 'menu:' || OLD.id::text);
+            PERFORM pg_notify('cms_menus', 'menu_location:' || COALESCE(OLD.location, ''));
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            PERFORM pg_notify('cms_menus', 'menu_location:' || COALESCE(NEW.location, ''));
+        END IF;
+    ELSE
+        IF TG_OP <> 'INSERT' THEN
+            PERFORM pg_notify('cms_menus', 'menu:' || OLD.menu_id::text);
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            PERFORM pg_notify('cms_menus', 'menu:' || NEW.menu_id::text);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER menus_changed_trigger
+    AFTER INSERT OR UPDATE OR DELETE ON menus
+    FOR EACH ROW EXECUTE FUNCTION notify_menu_changed();
+
+CREATE TRIGGER menu_items_changed_trigger
+    AFTER INSERT OR UPDATE OR DELETE ON menu_items
+    FOR EACH ROW EXECUTE FUNCTION notify_menu_changed();
+
 -- =============================================
 -- 9. 初始数据插入
 -- =============================================
@@ -787,6 +957,8 @@ COMMENT ON TABLE content IS '统一内容表，支持文章、页面和自定义
 COMMENT ON TABLE taxonomies IS '分类法表，定义分类体系';
 COMMENT ON TABLE terms IS '术语表，具体的分类或标签项';
 COMMENT ON TABLE content_terms IS '内容与术语关联表，多对多关系';
+COMMENT ON TABLE daily_content_stats IS '内容每日统计表，按天记录浏览、点赞、评论增量';
+COMMENT ON TABLE daily_site_stats IS '全站每日统计表，由内容每日统计定期压缩生成';
 COMMENT ON TABLE media IS '媒体文件表，存储文件信息和元数据';
 COMMENT ON TABLE media_metadata IS '媒体扩展元数据表';
 COMMENT ON TABLE comments IS '评论表，支持嵌套和审核';